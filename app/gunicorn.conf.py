@@ -0,0 +1,27 @@
+# Конфигурация gunicorn для production (Dockerfile.prod). Параметры переопределяются
+# переменными окружения GUNICORN_*.
+import multiprocessing
+import os
+
+bind = f'0.0.0.0:{os.getenv("PORT", "8000")}'
+
+# Потоковые воркеры: пока поток ждет ответа PostgreSQL, остальные потоки воркера
+# обрабатывают запросы. Число соединений с БД равно workers * threads.
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+
+# Приложение загружается один раз в мастер-процессе, воркеры получают его через fork.
+preload_app = True
+
+# Воркеры перезапускаются после max_requests запросов (со случайным разбросом,
+# чтобы не перезапускаться одновременно), что ограничивает рост потребления памяти.
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
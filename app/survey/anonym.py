@@ -0,0 +1,69 @@
+from django.conf import settings
+from django.core import signing
+from django.db import connection
+
+ANONYM_ID_SEQUENCE = 'survey_answer_anonym_id_seq'
+
+# Режим ANONYM_IDENTITY = 'signed': ID анонимного респондента передается клиенту токеном
+# "<id>:<HMAC>" в cookie или заголовке и проверяется только по подписи, без сессии.
+ANONYM_TOKEN_COOKIE = 'anonym'
+ANONYM_TOKEN_HEADER = 'X-Anonym-Token'
+ANONYM_TOKEN_SALT = 'survey.anonym'
+
+
+def next_anonym_id():
+    # последовательность выдает уникальные значения без блокировок и без чтения таблицы ответов
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT nextval(%s)', [ANONYM_ID_SEQUENCE])
+        return cursor.fetchone()[0]
+
+
+def next_anonym_ids(count):
+    # несколько новых ID одним запросом
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT nextval(%s) FROM generate_series(1, %s)', [ANONYM_ID_SEQUENCE, count])
+        return [anonym_id for anonym_id, in cursor.fetchall()]
+
+
+def read_anonym_token(request):
+    token = request.COOKIES.get(ANONYM_TOKEN_COOKIE) or request.META.get('HTTP_X_ANONYM_TOKEN')
+    if not token:
+        return None
+    try:
+        return int(signing.Signer(salt=ANONYM_TOKEN_SALT).unsign(token))
+    except (signing.BadSignature, ValueError):
+        return None
+
+
+def set_anonym_token(response, anonym_id):
+    token = signing.Signer(salt=ANONYM_TOKEN_SALT).sign(anonym_id)
+    response.set_cookie(
+        ANONYM_TOKEN_COOKIE, token, max_age=settings.ANONYM_TOKEN_MAX_AGE, httponly=True, samesite='Lax'
+    )
+    response[ANONYM_TOKEN_HEADER] = token
+
+
+def get_anonym_id(request):
+    # значение 0 - для аутентифицированных пользователей
+    if request.user.is_authenticated:
+        return 0
+
+    if settings.ANONYM_IDENTITY == 'signed':
+        anonym_id = read_anonym_token(request)
+        if anonym_id is None:
+            # токен выдается в ответе на этот запрос (AnonymTokenMixin)
+            anonym_id = request.issued_anonym_id = next_anonym_id()
+        return anonym_id
+
+    if 'ANONYM_ID' not in request.session:
+        request.session['ANONYM_ID'] = next_anonym_id()
+    return request.session['ANONYM_ID']
+
+
+def reserve_anonym_ids(max_anonym_id):
+    # после загрузки ответов с готовыми anonym_id последовательность сдвигается за них
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT setval(%s, GREATEST(last_value, %s)) FROM {ANONYM_ID_SEQUENCE}',
+            [ANONYM_ID_SEQUENCE, max_anonym_id]
+        )
@@ -1,5 +1,22 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+# кеши, содержимое которых видно только одному процессу
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
 
 
 class SurveyConfig(AppConfig):
     name = 'survey'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        # отзыв токенов (survey.authentication) хранится в кеше и должен доходить до всех воркеров
+        if settings.JWT_STATELESS and settings.CACHES['default']['BACKEND'] in PROCESS_LOCAL_CACHES:
+            raise ImproperlyConfigured(
+                'JWT_STATELESS требует общего для всех процессов кеша: задайте REDIS_URL или CACHE_BACKEND.'
+            )
@@ -0,0 +1,100 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.settings import api_settings as drf_settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.views import TokenObtainPairView
+
+User = get_user_model()
+
+# Утверждения, которые добавляются в токен при выдаче. Токен, выданный раньше
+# отзыва токенов пользователя (изменение прав, пароля, блокировка), отклоняется.
+TOKEN_CLAIMS = ('username', 'is_staff', 'iat')
+REVOKED_CACHE_KEY = 'auth-revoked:{}'
+
+# время отзыва токенов пользователей, прочитанное из общего кеша: {user_id: (checked, revoked)}
+_revocations = {}
+
+
+class SurveyTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        # Утверждения фиксируются при выдаче пары токенов: access-токены, полученные обновлением
+        # refresh-токена, копируют их без обращения к базе. Поэтому отзыв токенов при изменении
+        # пользователя (signals.revoke_tokens_on_user_change) обязателен: без него обновленный
+        # access-токен сохранял бы прежние is_staff и username до истечения refresh-токена.
+        token = super().get_token(user)
+        token['username'] = user.username
+        token['is_staff'] = user.is_staff
+        # доли секунды отличают токен, выданный сразу после отзыва, от отозванных
+        token['iat'] = time.time()
+        return token
+
+
+class SurveyTokenObtainPairView(TokenObtainPairView):
+    serializer_class = SurveyTokenObtainPairSerializer
+
+
+def revoke_tokens(user_id):
+    # отметка хранится, пока не истекут все выданные до нее токены
+    lifetime = max(api_settings.ACCESS_TOKEN_LIFETIME, api_settings.REFRESH_TOKEN_LIFETIME)
+    cache.set(REVOKED_CACHE_KEY.format(user_id), time.time(), int(lifetime.total_seconds()))
+    _revocations.pop(user_id, None)
+
+
+def revoked_at(user_id):
+    # общий кеш читается не чаще раза в JWT_REVOCATION_CHECK_TTL секунд на пользователя,
+    # поэтому отзыв доходит до других процессов с этой задержкой
+    now = time.monotonic()
+    entry = _revocations.get(user_id)
+    if entry is None or now - entry[0] > settings.JWT_REVOCATION_CHECK_TTL:
+        if len(_revocations) >= settings.JWT_REVOCATION_CACHE_SIZE:
+            _revocations.clear()
+        entry = _revocations[user_id] = (now, cache.get(REVOKED_CACHE_KEY.format(user_id)))
+    return entry[1]
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    # Пользователь восстанавливается из утверждений токена без запроса к базе данных.
+    # Токены без утверждений (выданные до их добавления) проверяются по базе.
+    def get_user(self, validated_token):
+        if any(claim not in validated_token for claim in TOKEN_CLAIMS):
+            return super().get_user(validated_token)
+
+        user = TokenUser(validated_token)
+        revoked = revoked_at(user.id)
+        if revoked is not None and validated_token['iat'] < revoked:
+            raise AuthenticationFailed('Token has been revoked.', code='token_revoked')
+        return user
+
+
+def api_authentication_classes():
+    # аутентификация по утверждениям токена включается только в API опросов:
+    # представления djoser (auth/users/me/ и другие) работают с моделью пользователя
+    if settings.JWT_STATELESS:
+        return [StatelessJWTAuthentication]
+    return drf_settings.DEFAULT_AUTHENTICATION_CLASSES
+
+
+class ApiAuthenticationMixin:
+    # классы аутентификации выбираются при каждом запросе, а не при импорте представлений,
+    # поэтому override_settings(JWT_STATELESS=...) действует и в тестах
+    def get_authenticators(self):
+        return [authentication() for authentication in api_authentication_classes()]
+
+
+def request_user(request):
+    # пользователь для ссылки ответа на респондента; TokenUser не является моделью,
+    # поэтому вместо него подставляется несохраняемый экземпляр модели с данными токена
+    user = request.user
+    if not user.is_authenticated:
+        return None
+    if isinstance(user, TokenUser):
+        return User(id=user.id, username=user.username, is_staff=user.is_staff)
+    return user
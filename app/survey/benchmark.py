@@ -0,0 +1,31 @@
+import random
+
+# Сценарии нагрузочного теста: {имя: (от имени администратора, метод, построитель (url, тело))}.
+# Общие для bench/loadtest.py и команды profile_queries; модуль не зависит от Django,
+# чтобы скрипт нагрузочного теста мог импортировать его вне контейнера.
+
+
+def scenarios(api, seed, page_size):
+    def survey():
+        return random.choice(seed['surveys'])
+
+    def answers_url():
+        chosen = survey()
+        return f'{api}/surveys/{chosen["id"]}/questions/{random.choice(chosen["questions"])}/answers/'
+
+    def answer_create():
+        # первый вопрос каждого опроса seed_benchmark - с единственным вариантом ответа
+        chosen = survey()
+        return f'{api}/surveys/{chosen["id"]}/questions/{chosen["questions"][0]}/answers/', {'choices': [0]}
+
+    def answer_list():
+        pages = max(seed.get('answers', page_size) // page_size, 1)
+        return f'{answers_url()}?page={random.randint(1, pages)}', None
+
+    return {
+        'survey-retrieve': (False, 'GET', lambda: (f'{api}/surveys/{survey()["id"]}/', None)),
+        'survey-list': (False, 'GET', lambda: (f'{api}/surveys/', None)),
+        'answer-create': (False, 'POST', answer_create),
+        'answer-list': (True, 'GET', answer_list),
+        'answer-stat': (True, 'GET', lambda: (f'{answers_url()}stat/', None)),
+    }
@@ -0,0 +1,81 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import quote_etag
+from rest_framework.utils.encoders import JSONEncoder
+
+SURVEY_CACHE_KEY = 'survey:{}:{}'
+SURVEY_VERSION_CACHE_KEY = 'survey-version:{}'
+ANSWERS_VERSION_CACHE_KEY = 'survey-answers-version:{}'
+ANALYTICS_CACHE_KEY = 'analytics:{}:{}:{}:{}'
+
+
+def get_version(key):
+    version = cache.get(key)
+    if version is None:
+        # после вытеснения ключа версия не должна совпасть ни с одной из прежних
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_versions(keys):
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            # ключа нет - следующее чтение создаст новую версию
+            pass
+
+
+# Версия опроса входит в ключ кешированного опроса и увеличивается после фиксации каждого
+# его изменения. Версия читается до чтения опроса из базы, поэтому данные, прочитанные
+# параллельным запросом до изменения, сохраняются под прежней версией и больше не читаются.
+def survey_version(survey_id):
+    return get_version(SURVEY_VERSION_CACHE_KEY.format(survey_id))
+
+
+def survey_cache_key(survey_id, version):
+    return SURVEY_CACHE_KEY.format(survey_id, version)
+
+
+def get_cached_survey(survey_id, version):
+    return cache.get(survey_cache_key(survey_id, version))
+
+
+def cache_survey(survey_id, version, data):
+    content = json.dumps(data, cls=JSONEncoder, sort_keys=True)
+    entry = {
+        'data': data,
+        'etag': quote_etag(hashlib.md5(content.encode()).hexdigest()),
+    }
+    cache.set(survey_cache_key(survey_id, version), entry, settings.SURVEY_CACHE_TIMEOUT)
+    return entry
+
+
+def invalidate_surveys(survey_ids):
+    bump_versions(SURVEY_VERSION_CACHE_KEY.format(survey_id) for survey_id in survey_ids)
+
+
+# Версия ответов опроса входит в ключи кешированных аналитических результатов
+# и увеличивается при каждой записи ответов, поэтому устаревшие результаты не читаются.
+def answers_version(survey_id):
+    return get_version(ANSWERS_VERSION_CACHE_KEY.format(survey_id))
+
+
+def bump_answers_version(survey_ids):
+    bump_versions(ANSWERS_VERSION_CACHE_KEY.format(survey_id) for survey_id in survey_ids)
+
+
+def get_or_compute_analytics(name, survey_id, params, compute):
+    # результат аналитического запроса по ответам опроса кешируется до записи новых ответов
+    digest = hashlib.md5(json.dumps(params, sort_keys=True).encode()).hexdigest()
+    key = ANALYTICS_CACHE_KEY.format(name, survey_id, answers_version(survey_id), digest)
+    data = cache.get(key)
+    if data is None:
+        data = compute()
+        cache.set(key, data, settings.ANALYTICS_CACHE_TIMEOUT)
+    return data
@@ -0,0 +1,147 @@
+from collections import Counter
+
+from django.db import connection
+from django.db.models import Sum
+
+from .models import Answer, AnswerCounter
+
+# Счетчики, вычисленные по таблице ответов. Используются для перестроения
+# таблицы счетчиков и проверки ее расхождения с ответами.
+ANSWER_COUNTERS_SQL = '''
+SELECT survey_id, question_id, user_id IS NULL AS anonym, {answers_total} AS choice, COUNT(*) AS count
+FROM {answers}
+GROUP BY 1, 2, 3
+UNION ALL
+SELECT survey_id, question_id, user_id IS NULL, {text_answers}, COUNT(*)
+FROM {answers}
+WHERE text <> ''
+GROUP BY 1, 2, 3
+UNION ALL
+SELECT survey_id, question_id, user_id IS NULL, choice, COUNT(*)
+FROM {answers}, unnest(choices) AS choice
+GROUP BY 1, 2, 3, 4
+'''.format(
+    answers=Answer._meta.db_table,
+    answers_total=AnswerCounter.ANSWERS_TOTAL,
+    text_answers=AnswerCounter.TEXT_ANSWERS,
+)
+
+INCREMENT_SQL = '''
+INSERT INTO {counters} (survey_id, question_id, anonym, choice, count)
+VALUES {values}
+ON CONFLICT (survey_id, question_id, anonym, choice)
+DO UPDATE SET count = {counters}.count + EXCLUDED.count
+'''
+
+# Строки счетчиков блокируются в порядке ключа: иначе две транзакции (массовая запись,
+# перенос очереди, импорт, изменение ответов), меняющие одни и те же счетчики в разном порядке,
+# могут заблокировать друг друга.
+LOCK_SQL = '''
+SELECT 1 FROM {counters}
+WHERE (survey_id, question_id, anonym, choice) IN ({values})
+ORDER BY survey_id, question_id, anonym, choice
+FOR UPDATE
+'''
+
+# Уменьшение счетчиков не создает новых строк: при каскадном удалении опроса
+# строки счетчиков могут быть удалены раньше, чем ответы.
+DECREMENT_SQL = '''
+UPDATE {counters} AS counter
+SET count = counter.count + delta.count
+FROM (VALUES {values}) AS delta (survey_id, question_id, anonym, choice, count)
+WHERE counter.survey_id = delta.survey_id
+    AND counter.question_id = delta.question_id
+    AND counter.anonym = delta.anonym
+    AND counter.choice = delta.choice
+'''
+
+
+def answer_keys(survey_id, question_id, user_id, text, choices):
+    anonym = user_id is None
+    keys = [(survey_id, question_id, anonym, AnswerCounter.ANSWERS_TOTAL)]
+    if text:
+        keys.append((survey_id, question_id, anonym, AnswerCounter.TEXT_ANSWERS))
+    for choice in choices or ():
+        keys.append((survey_id, question_id, anonym, choice))
+    return keys
+
+
+def answers_deltas(answers, sign=1):
+    deltas = Counter()
+    for answer in answers:
+        for key in answer_keys(answer.survey_id, answer.question_id, answer.user_id, answer.text, answer.choices):
+            deltas[key] += sign
+    return deltas
+
+
+def _execute(sql, rows):
+    # строки VALUES упорядочены по ключу счетчика
+    rows = sorted(rows)
+    values = ', '.join(['(' + ', '.join(['%s'] * len(rows[0])) + ')'] * len(rows))
+    params = [value for row in rows for value in row]
+    with connection.cursor() as cursor:
+        cursor.execute(sql.format(counters=AnswerCounter._meta.db_table, values=values), params)
+
+
+def update_counters(deltas):
+    increments = {key: count for key, count in deltas.items() if count > 0}
+    decrements = {key: count for key, count in deltas.items() if count < 0}
+
+    if increments and decrements:
+        # увеличение и уменьшение выполняются разными запросами, поэтому существующие строки
+        # сначала блокируются одним запросом в общем порядке ключей (изменение ответа)
+        _execute(LOCK_SQL, [*increments, *decrements])
+    if increments:
+        _execute(INCREMENT_SQL, [(*key, count) for key, count in increments.items()])
+    if decrements:
+        _execute(DECREMENT_SQL, [(*key, count) for key, count in decrements.items()])
+
+
+def counters_stat(survey_id, question_id, anonym=None):
+    counters = AnswerCounter.objects.filter(survey_id=survey_id, question_id=question_id)
+    if anonym is not None:
+        counters = counters.filter(anonym=anonym)
+    rows = counters.values_list('choice').annotate(total=Sum('count')).order_by('choice')
+    return totals_stat(dict(rows))
+
+
+def survey_answers_total(survey_id):
+    # число ответов опроса по строкам счетчиков (по строке на вопрос и группу респондентов)
+    total = AnswerCounter.objects.filter(
+        survey_id=survey_id, choice=AnswerCounter.ANSWERS_TOTAL
+    ).aggregate(total=Sum('count'))['total']
+    return total or 0
+
+
+def totals_stat(totals):
+    # статистика в формате эндпоинта stat по числу ответов на каждый вариант
+    statistics = {choice: count for choice, count in totals.items() if choice >= 0 and count}
+    statistics['answersTotalCount'] = totals.get(AnswerCounter.ANSWERS_TOTAL, 0)
+    statistics['textAnswersCount'] = totals.get(AnswerCounter.TEXT_ANSWERS, 0)
+    return statistics
+
+
+def expected_counters():
+    with connection.cursor() as cursor:
+        cursor.execute(ANSWER_COUNTERS_SQL)
+        return {tuple(row[:4]): row[4] for row in cursor.fetchall()}
+
+
+def stored_counters():
+    return {
+        tuple(row[:4]): row[4]
+        for row in AnswerCounter.objects.exclude(count=0).values_list(
+            'survey_id', 'question_id', 'anonym', 'choice', 'count'
+        )
+    }
+
+
+def rebuild_counters():
+    table = AnswerCounter._meta.db_table
+    with connection.cursor() as cursor:
+        # блокируем запись ответов, чтобы счетчики не разошлись во время перестроения
+        cursor.execute(f'LOCK TABLE {Answer._meta.db_table} IN SHARE MODE')
+        cursor.execute(f'DELETE FROM {table}')
+        cursor.execute(
+            f'INSERT INTO {table} (survey_id, question_id, anonym, choice, count) {ANSWER_COUNTERS_SQL}'
+        )
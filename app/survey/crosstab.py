@@ -0,0 +1,98 @@
+import math
+
+import numpy as np
+from django.db import connections
+
+# Таблица сопряженности двух вопросов с вариантами ответа: число респондентов
+# (user_id, anonym_id), выбравших вариант row в первом вопросе и вариант column во втором.
+# Повторные ответы респондента на вопрос не увеличивают счетчики (DISTINCT).
+CROSSTAB_SQL = '''
+WITH answers AS NOT MATERIALIZED ({answers}),
+row_choices AS (
+    SELECT DISTINCT COALESCE(user_id, 0) AS user_id, anonym_id, choice
+    FROM answers, unnest(answers.choices) AS choice
+    WHERE question_id = %s
+),
+column_choices AS (
+    SELECT DISTINCT COALESCE(user_id, 0) AS user_id, anonym_id, choice
+    FROM answers, unnest(answers.choices) AS choice
+    WHERE question_id = %s
+)
+SELECT row_choices.choice, column_choices.choice, COUNT(*)
+FROM row_choices JOIN column_choices USING (user_id, anonym_id)
+GROUP BY 1, 2
+'''
+
+# точность и предельное число итераций при вычислении неполной гамма-функции
+GAMMA_EPS = 1e-12
+GAMMA_ITERATIONS = 1000
+
+
+def crosstab(queryset, row_question, column_question):
+    sql, params = queryset.order_by().values(
+        'question_id', 'user_id', 'anonym_id', 'choices'
+    ).query.sql_with_params()
+
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(CROSSTAB_SQL.format(answers=sql), (*params, row_question.id, column_question.id))
+        rows = cursor.fetchall()
+
+    table = np.zeros((len(row_question.answers_pool), len(column_question.answers_pool)), dtype=np.int64)
+    for row_choice, column_choice, count in rows:
+        if row_choice < table.shape[0] and column_choice < table.shape[1]:
+            table[row_choice, column_choice] = count
+    return table
+
+
+def chi2_sf(statistic, dof):
+    # P(X > statistic) для распределения хи-квадрат - регуляризованная верхняя неполная
+    # гамма-функция Q(dof / 2, statistic / 2): ряд при x < a + 1, иначе цепная дробь
+    a, x = dof / 2, statistic / 2
+    if x <= 0:
+        return 1.0
+    log_prefix = a * math.log(x) - x - math.lgamma(a)
+
+    if x < a + 1:
+        term = total = 1 / a
+        for n in range(1, GAMMA_ITERATIONS):
+            term *= x / (a + n)
+            total += term
+            if abs(term) < abs(total) * GAMMA_EPS:
+                break
+        return max(0.0, 1 - total * math.exp(log_prefix))
+
+    b = x + 1 - a
+    c = 1 / 1e-300
+    d = 1 / b
+    h = d
+    for n in range(1, GAMMA_ITERATIONS):
+        an = -n * (n - a)
+        b += 2
+        d = an * d + b
+        d = 1 / (d if abs(d) > 1e-300 else 1e-300)
+        c = b + an / c
+        c = c if abs(c) > 1e-300 else 1e-300
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < GAMMA_EPS:
+            break
+    return math.exp(log_prefix) * h
+
+
+def chi_square(table):
+    # критерий независимости хи-квадрат; пустые строки и столбцы не учитываются
+    table = table[table.sum(axis=1) > 0][:, table.sum(axis=0) > 0]
+    total = table.sum()
+    if total == 0 or min(table.shape) < 2:
+        return None
+
+    expected = np.outer(table.sum(axis=1), table.sum(axis=0)) / total
+    statistic = float(((table - expected) ** 2 / expected).sum())
+    dof = (table.shape[0] - 1) * (table.shape[1] - 1)
+    return {
+        'statistic': round(statistic, 6),
+        'dof': dof,
+        'pValue': chi2_sf(statistic, dof),
+        # мера связи Крамера: 0 - признаки независимы, 1 - полностью связаны
+        'cramersV': round(math.sqrt(statistic / (total * (min(table.shape) - 1))), 6),
+    }
@@ -0,0 +1,126 @@
+import gzip
+import os
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .cache import invalidate_surveys
+from .counters import survey_answers_total
+from .export import export_rows, ndjson_lines
+from .models import Answer, Survey, SurveyDeletion
+from .partitioning import detach_survey_partition, is_partitioned, partitioning_enabled
+
+# Ответы удаляются порциями, каждая в своей транзакции, без загрузки в память и без
+# сигналов ответов: счетчики и итоги удаляются вместе с опросом.
+DELETE_ANSWERS_SQL = '''
+DELETE FROM {answers} WHERE id IN (
+    SELECT id FROM {answers} WHERE survey_id = %s LIMIT %s
+)
+'''.format(answers=Answer._meta.db_table)
+# как часто (в ответах) архивирование отмечает, что задание выполняется
+ARCHIVE_HEARTBEAT_ROWS = 10000
+
+
+def schedule_deletion(survey, archive=False):
+    # Опрос скрывается из API в той же транзакции, в которой создается задание, и новые ответы
+    # в него не принимаются. Повторный запрос возвращает уже запланированное задание
+    # или None, если оно успело завершиться и опроса больше нет.
+    try:
+        with transaction.atomic():
+            Survey.objects.filter(id=survey.id).update(deletion_scheduled=True)
+            deletion = SurveyDeletion.objects.create(survey_id=survey.id, archive=archive)
+            transaction.on_commit(lambda: invalidate_surveys([survey.id]))
+            return deletion
+    except IntegrityError:
+        return SurveyDeletion.objects.filter(
+            survey_id=survey.id, status__in=SurveyDeletion.ACTIVE_STATUSES
+        ).first()
+
+
+def next_deletion():
+    # задание остановленного обработчика берется снова, когда его прогресс перестал обновляться
+    stale = timezone.now() - timezone.timedelta(seconds=settings.SURVEY_DELETION_STALE_TIMEOUT)
+    with transaction.atomic():
+        deletion = SurveyDeletion.objects.select_for_update(skip_locked=True).filter(
+            Q(status=SurveyDeletion.PENDING) | Q(status=SurveyDeletion.RUNNING, updated_at__lt=stale)
+        ).order_by('id').first()
+        if deletion is not None:
+            deletion.status = SurveyDeletion.RUNNING
+            deletion.started_at = deletion.started_at or timezone.now()
+            deletion.save(update_fields=('status', 'started_at', 'updated_at'))
+    return deletion
+
+
+def archive_answers(deletion):
+    # Ответы в формате выгрузки NDJSON, сжатые gzip. Время обновления задания отмечается каждые
+    # ARCHIVE_HEARTBEAT_ROWS ответов, иначе долгое архивирование считалось бы остановленным
+    # (SURVEY_DELETION_STALE_TIMEOUT) и задание взял бы второй обработчик.
+    os.makedirs(settings.SURVEY_ARCHIVE_DIR, exist_ok=True)
+    path = os.path.join(
+        settings.SURVEY_ARCHIVE_DIR,
+        f'survey-{deletion.survey_id}-answers-{timezone.now():%Y%m%d%H%M%S}.ndjson.gz'
+    )
+    lines = ndjson_lines(export_rows(Answer.objects.filter(survey_id=deletion.survey_id)))
+    with gzip.open(path, 'wt', encoding='utf-8') as archive:
+        for number, line in enumerate(lines, start=1):
+            archive.write(line)
+            if number % ARCHIVE_HEARTBEAT_ROWS == 0:
+                deletion.save(update_fields=('updated_at',))
+    return path
+
+
+def delete_answers(deletion, batch_size):
+    if partitioning_enabled() and is_partitioned():
+        # секция опроса удаляется целиком; ответы из секции по умолчанию удаляются порциями
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {Answer._meta.db_table} WHERE survey_id = %s', [deletion.survey_id])
+            partition_count = cursor.fetchone()[0]
+        if detach_survey_partition(deletion.survey_id, drop=True) is not None:
+            deletion.answers_deleted += partition_count
+            deletion.save(update_fields=('answers_deleted', 'updated_at'))
+
+    while True:
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(DELETE_ANSWERS_SQL, [deletion.survey_id, batch_size])
+                deleted = cursor.rowcount
+            deletion.answers_deleted += deleted
+            deletion.save(update_fields=('answers_deleted', 'updated_at'))
+        if deleted < batch_size:
+            return
+
+
+def delete_survey(survey_id):
+    # FOR UPDATE на строке опроса не дает записать в него новые ответы (как в rollup_survey);
+    # оставшиеся ответы удаляются тем же запросом, а опрос - ORM с каскадом по небольшим таблицам
+    with transaction.atomic():
+        survey = Survey.objects.select_for_update().filter(id=survey_id).first()
+        if survey is None:
+            return 0
+        deleted = Answer.objects.filter(survey_id=survey_id)._raw_delete(Answer.objects.db)
+        survey.delete()
+        return deleted
+
+
+def process_deletion(deletion, batch_size):
+    try:
+        if deletion.archive and not deletion.archive_path:
+            deletion.archive_path = archive_answers(deletion)
+            deletion.save(update_fields=('archive_path', 'updated_at'))
+        if deletion.answers_total is None:
+            # по счетчикам ответов: COUNT(*) по ответам большого опроса не обновлял бы задание
+            deletion.answers_total = survey_answers_total(deletion.survey_id)
+            deletion.save(update_fields=('answers_total', 'updated_at'))
+
+        delete_answers(deletion, batch_size)
+        deletion.answers_deleted += delete_survey(deletion.survey_id)
+        deletion.status = SurveyDeletion.DONE
+    except Exception as error:
+        deletion.status = SurveyDeletion.FAILED
+        deletion.error = repr(error)
+        raise
+    finally:
+        deletion.finished_at = timezone.now()
+        deletion.save()
@@ -0,0 +1,58 @@
+import csv
+import json
+
+from django.db import connections
+from django.db.models import Q
+
+EXPORT_FIELDS = ('id', 'survey', 'question', 'question_text', 'user', 'anonym_id', 'text', 'choices')
+EXPORT_CHUNK_SIZE = 2000
+
+
+class Echo:
+    # псевдобуфер для csv.writer: строка не накапливается, а сразу возвращается
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    # имена пользователей и тексты вопросов берутся соединением в том же запросе
+    rows = queryset.order_by('question_id', 'id').values_list(
+        'id', 'survey_id', 'question_id', 'question__text', 'user__username', 'anonym_id', 'text', 'choices'
+    )
+    if connections[queryset.db].settings_dict.get('DISABLE_SERVER_SIDE_CURSORS'):
+        return keyset_rows(rows, chunk_size)
+    # строки читаются серверным курсором порциями по chunk_size
+    return rows.iterator(chunk_size=chunk_size)
+
+
+def keyset_rows(rows, chunk_size):
+    # без серверных курсоров (PgBouncer) строки читаются порциями по ключу (question_id, id),
+    # чтобы не загружать весь результат в память
+    chunk = rows
+    while True:
+        chunk_rows = list(chunk[:chunk_size])
+        yield from chunk_rows
+        if len(chunk_rows) < chunk_size:
+            return
+
+        last_id, _, last_question_id, *_ = chunk_rows[-1]
+        chunk = rows.filter(Q(question_id__gt=last_question_id) | Q(question_id=last_question_id, id__gt=last_id))
+
+
+def csv_lines(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        *values, choices = row
+        yield writer.writerow([*values, json.dumps(choices) if choices is not None else ''])
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(EXPORT_FIELDS, row)), ensure_ascii=False) + '\n'
+
+
+EXPORT_FORMATS = {
+    'csv': csv_lines,
+    'ndjson': ndjson_lines,
+}
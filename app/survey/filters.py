@@ -5,6 +5,7 @@ from django.db.models import Q
 from django_filters import rest_framework as filters
 
 from .models import Answer, Survey
+from .search import search_answers
 
 User = get_user_model()
 
@@ -32,12 +33,16 @@ class SurveyFilter(filters.FilterSet):
 class AnswerFilter(filters.FilterSet):
     user = filters.CharFilter(method='user_filter')
     anonym = filters.BooleanFilter(field_name='user', lookup_expr='isnull')
+    search = filters.CharFilter(method='search_filter')
 
     def user_filter(self, queryset, name, value):
         if value == 'anonym':
             return queryset.filter(user=None)
         return queryset.filter(user__username=value)
 
+    def search_filter(self, queryset, name, value):
+        return search_answers(queryset, value)
+
     class Meta:
         model = Answer
-        fields = ('anonym', 'user', 'anonym_id')
+        fields = ('anonym', 'user', 'anonym_id', 'search')
@@ -0,0 +1,115 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from rest_framework.exceptions import APIException
+
+from .models import Answer, PendingAnswer, QuestionSurvey, User
+from .signals import answers_bulk_created
+
+PENDING_DEPTH_CACHE_KEY = 'answer-queue:depth'
+# Глубина, опубликованная обработчиком, устаревает, если он остановлен; после этого переполнение
+# проверяется по таблице очереди, и результат проверки кешируется на PENDING_CHECK_TIMEOUT секунд.
+PENDING_DEPTH_TIMEOUT = 30
+PENDING_CHECK_TIMEOUT = 1
+
+DEQUEUE_SQL = '''
+DELETE FROM {pending}
+WHERE id IN (
+    SELECT id FROM {pending}
+    ORDER BY id
+    LIMIT %s
+    FOR UPDATE SKIP LOCKED
+)
+RETURNING user_id, survey_id, question_id, text, choices, anonym_id
+'''.format(pending=PendingAnswer._meta.db_table)
+
+
+class AnswerQueueFull(APIException):
+    status_code = 503
+    default_detail = 'Answer queue is full, retry later.'
+    default_code = 'answer_queue_full'
+
+    def __init__(self, wait):
+        super().__init__()
+        # DRF передает wait клиенту в заголовке Retry-After
+        self.wait = wait
+
+
+def queue_enabled():
+    return settings.ANSWER_INGESTION_MODE == 'queue'
+
+
+def pending_depth(limit=None):
+    # с limit подсчет останавливается на limit ответах
+    if limit is None:
+        return PendingAnswer.objects.count()
+    return PendingAnswer.objects.all()[:limit].count()
+
+
+def publish_pending_depth(depth, timeout=PENDING_DEPTH_TIMEOUT):
+    cache.set(PENDING_DEPTH_CACHE_KEY, depth, timeout)
+
+
+def queue_full():
+    # глубина очереди публикуется обработчиком очереди через кеш, поэтому обычно
+    # проверка переполнения не обращается к базе
+    depth = cache.get(PENDING_DEPTH_CACHE_KEY)
+    if depth is None:
+        # ограниченная проверка: есть ли в очереди ответ с номером ANSWER_QUEUE_MAX_PENDING (OFFSET)
+        full = PendingAnswer.objects.all()[settings.ANSWER_QUEUE_MAX_PENDING - 1:].exists()
+        depth = settings.ANSWER_QUEUE_MAX_PENDING if full else 0
+        publish_pending_depth(depth, PENDING_CHECK_TIMEOUT)
+    return depth >= settings.ANSWER_QUEUE_MAX_PENDING
+
+
+def enqueue(answers):
+    if queue_full():
+        raise AnswerQueueFull(wait=max(1, round(settings.ANSWER_QUEUE_FLUSH_INTERVAL)))
+
+    PendingAnswer.objects.bulk_create([
+        PendingAnswer(
+            user_id=answer.user_id,
+            survey_id=answer.survey_id,
+            question_id=answer.question_id,
+            text=answer.text,
+            choices=answer.choices,
+            anonym_id=answer.anonym_id
+        )
+        for answer in answers
+    ])
+
+
+def drain(batch_size):
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(DEQUEUE_SQL, [batch_size])
+            rows = cursor.fetchall()
+        if not rows:
+            return 0
+
+        # ответы на удаленные (или запланированные к удалению) за время ожидания опросы,
+        # вопросы и пользователей отбрасываются
+        question_surveys = set(QuestionSurvey.objects.filter(
+            survey_id__in={row[1] for row in rows},
+            question_id__in={row[2] for row in rows},
+            survey__deletion_scheduled=False
+        ).values_list('survey_id', 'question_id'))
+        users = set(User.objects.filter(
+            id__in={row[0] for row in rows if row[0] is not None}
+        ).values_list('id', flat=True))
+
+        answers = Answer.objects.bulk_create([
+            Answer(
+                user_id=user_id,
+                survey_id=survey_id,
+                question_id=question_id,
+                text=text,
+                choices=choices,
+                anonym_id=anonym_id
+            )
+            for user_id, survey_id, question_id, text, choices, anonym_id in rows
+            if (survey_id, question_id) in question_surveys and (user_id is None or user_id in users)
+        ])
+        answers_bulk_created.send(sender=Answer, answers=answers)
+
+    return len(rows)
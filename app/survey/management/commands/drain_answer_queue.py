@@ -0,0 +1,62 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from survey.ingestion import drain, pending_depth, publish_pending_depth
+
+# как часто (в секундах) публикуется глубина очереди, пока ответы переносятся полными пачками
+PUBLISH_INTERVAL = 5
+
+
+class Command(BaseCommand):
+    help = 'Переносит ответы из очереди (ANSWER_INGESTION_MODE = "queue") в таблицу ответов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.ANSWER_QUEUE_BATCH_SIZE,
+            help='Число ответов, записываемых одной транзакцией.'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=settings.ANSWER_QUEUE_FLUSH_INTERVAL,
+            help='Пауза (в секундах) перед следующей записью, если очередь опустела.'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Опустошить очередь и завершиться.'
+        )
+        parser.add_argument(
+            '--status',
+            action='store_true',
+            help='Только вывести число ответов в очереди.'
+        )
+
+    def handle(self, *args, **options):
+        if options['status']:
+            depth = pending_depth()
+            publish_pending_depth(depth)
+            self.stdout.write(f'Ответов в очереди: {depth}.')
+            return
+
+        batch_size = options['batch_size']
+        published = None
+        try:
+            while True:
+                moved = drain(batch_size)
+                # подсчет ограничен порогом переполнения; после каждой пачки очередь не пересчитывается
+                if moved < batch_size or published is None or time.monotonic() - published >= PUBLISH_INTERVAL:
+                    publish_pending_depth(pending_depth(limit=settings.ANSWER_QUEUE_MAX_PENDING))
+                    published = time.monotonic()
+                if moved:
+                    self.stdout.write(f'Записано ответов: {moved}.')
+                if moved < batch_size:
+                    if options['once']:
+                        return
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
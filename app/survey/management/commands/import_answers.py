@@ -0,0 +1,239 @@
+import csv
+import io
+import json
+import sys
+import tempfile
+import time
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from rest_framework.exceptions import ValidationError
+
+from survey.anonym import next_anonym_ids, reserve_anonym_ids
+from survey.models import Answer, Question, QuestionSurvey, User
+from survey.serializers import validate_answer
+from survey.signals import answers_bulk_created
+from survey.validators import validate_choices
+
+COPY_FIELDS = ('user_id', 'survey_id', 'question_id', 'text', 'choices', 'anonym_id')
+COPY_SQL = f'COPY {Answer._meta.db_table} ({", ".join(COPY_FIELDS)}) FROM STDIN'
+
+
+# Читатель возвращает строки файла как есть, а разбор строки выполняется при ее проверке:
+# строка, которую не удалось разобрать, отклоняется, как и не прошедшая проверку.
+def read_csv(stream):
+    return csv.DictReader(stream)
+
+
+def parse_csv(row):
+    choices = row.get('choices')
+    return {**row, 'choices': json.loads(choices) if choices else None}
+
+
+def read_ndjson(stream):
+    return (line.rstrip('\n') for line in stream if line.strip())
+
+
+def parse_ndjson(line):
+    row = json.loads(line)
+    if not isinstance(row, dict):
+        raise ValidationError('Row should be a JSON object.')
+    return row
+
+
+READERS = {
+    'csv': (read_csv, parse_csv),
+    'ndjson': (read_ndjson, parse_ndjson),
+}
+
+
+def copy_value(value):
+    # значение в текстовом формате COPY
+    if value is None:
+        return r'\N'
+    if isinstance(value, list):
+        return '{' + ','.join(map(str, value)) + '}'
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('\t', '\\t')
+        .replace('\n', '\\n')
+        .replace('\r', '\\r')
+    )
+
+
+def error_message(error):
+    if isinstance(error, ValidationError):
+        return ' '.join(map(str, error.detail))
+    if isinstance(error, DjangoValidationError):
+        return ' '.join(error.messages)
+    return str(error)
+
+
+def optional_int(value):
+    return int(value) if value not in (None, '') else None
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает ответы из CSV или NDJSON (в формате выгрузки surveys/<id>/answers/export) '
+        'через COPY с проверкой по тем же правилам, что и API.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу или `-` для чтения из stdin.')
+        parser.add_argument(
+            '--format',
+            choices=READERS,
+            help='Формат файла (по умолчанию определяется по расширению).'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help='Число ответов, загружаемых одной транзакцией.'
+        )
+        parser.add_argument(
+            '--rejects',
+            help='Файл, в который записываются отклоненные строки (NDJSON).'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or path.rpartition('.')[2]
+        if file_format not in READERS:
+            raise CommandError('Не удалось определить формат файла, укажите --format.')
+
+        # справочники строятся один раз на всю загрузку
+        self.questions = {
+            question_id: (answer_type, len(answers_pool) if answers_pool else 0)
+            for question_id, answer_type, answers_pool in Question.objects.values_list(
+                'id', 'answer_type', 'answers_pool'
+            )
+        }
+        self.question_surveys = set(QuestionSurvey.objects.filter(
+            survey__deletion_scheduled=False
+        ).values_list('survey_id', 'question_id'))
+        self.users = dict(User.objects.values_list('username', 'id'))
+
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        rejects = open(options['rejects'], 'w', encoding='utf-8') if options['rejects'] else None
+        try:
+            read, parse = READERS[file_format]
+            self.load(read(stream), parse, options['batch_size'], rejects)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            if rejects is not None:
+                rejects.close()
+
+    def load(self, rows, parse, batch_size, rejects):
+        started = time.monotonic()
+        imported = rejected = max_anonym_id = 0
+        batch = []
+
+        # Ответы анонимных респондентов без anonym_id откладываются во временный файл и загружаются
+        # после всех остальных: новые ID выдаются только после сдвига последовательности за
+        # наибольший anonym_id всего файла и не совпадают с ID респондентов из следующих строк.
+        with tempfile.TemporaryFile('w+', encoding='utf-8') as deferred:
+            for line_number, row in enumerate(rows, start=1):
+                try:
+                    answer = self.build_answer(parse(row))
+                except (ValidationError, DjangoValidationError, KeyError, TypeError, ValueError) as error:
+                    rejected += 1
+                    if rejects is not None:
+                        rejects.write(json.dumps(
+                            {'line': line_number, 'row': row, 'error': error_message(error)}, ensure_ascii=False
+                        ) + '\n')
+                    continue
+
+                if answer.anonym_id is None:
+                    deferred.write(json.dumps([getattr(answer, field) for field in COPY_FIELDS]) + '\n')
+                    continue
+
+                batch.append(answer)
+                max_anonym_id = max(max_anonym_id, answer.anonym_id)
+                if len(batch) >= batch_size:
+                    imported += self.copy(batch)
+                    batch = []
+                    self.report(imported, rejected, started)
+
+            if batch:
+                imported += self.copy(batch)
+                batch = []
+            if max_anonym_id:
+                reserve_anonym_ids(max_anonym_id)
+
+            # ответ анонимного респондента без anonym_id считается ответом отдельного респондента и получает
+            # новый ID, чтобы статистика и таблицы сопряженности группировали его по anonym_id
+            deferred.seek(0)
+            for line in deferred:
+                batch.append(Answer(**dict(zip(COPY_FIELDS, json.loads(line)))))
+                if len(batch) >= batch_size:
+                    imported += self.copy_with_new_anonym_ids(batch)
+                    batch = []
+                    self.report(imported, rejected, started)
+            if batch:
+                imported += self.copy_with_new_anonym_ids(batch)
+
+        self.report(imported, rejected, started, style=self.style.SUCCESS)
+
+    def build_answer(self, row):
+        survey_id = int(row['survey'])
+        question_id = int(row['question'])
+        if (survey_id, question_id) not in self.question_surveys:
+            raise ValidationError('Question not found in survey.')
+
+        user_id = None
+        if row.get('user'):
+            if row['user'] not in self.users:
+                raise ValidationError('User not found.')
+            user_id = self.users[row['user']]
+
+        text = row.get('text') or ''
+        choices = row.get('choices')
+        if choices is not None:
+            choices = [int(choice) for choice in choices]
+            if min(choices, default=0) < 0:
+                raise ValidationError('Choices should not be negative.')
+            validate_choices(choices)
+        validate_answer(*self.questions[question_id], text, choices)
+
+        anonym_id = optional_int(row.get('anonym_id'))
+        # anonym_id = 0 означает всех аутентифицированных пользователей
+        if user_id is None and anonym_id is not None and anonym_id < 1:
+            raise ValidationError('Anonym id of an anonymous answer should be positive.')
+        return Answer(
+            user_id=user_id,
+            survey_id=survey_id,
+            question_id=question_id,
+            text=text,
+            choices=choices,
+            anonym_id=0 if user_id is not None else anonym_id
+        )
+
+    def copy_with_new_anonym_ids(self, answers):
+        for answer, anonym_id in zip(answers, next_anonym_ids(len(answers))):
+            answer.anonym_id = anonym_id
+        return self.copy(answers)
+
+    def copy(self, answers):
+        buffer = io.StringIO()
+        for answer in answers:
+            buffer.write('\t'.join(copy_value(getattr(answer, field)) for field in COPY_FIELDS) + '\n')
+        buffer.seek(0)
+
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.copy_expert(COPY_SQL, buffer)
+            answers_bulk_created.send(sender=Answer, answers=answers)
+        return len(answers)
+
+    def report(self, imported, rejected, started, style=None):
+        elapsed = time.monotonic() - started
+        message = (
+            f'Загружено: {imported}, отклонено: {rejected}, '
+            f'время: {elapsed:.1f} с, скорость: {imported / elapsed if elapsed else 0:.0f} ответов/с.'
+        )
+        self.stdout.write(style(message) if style else message)
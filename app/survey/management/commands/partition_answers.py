@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from survey.partitioning import (convert_answer_table, create_missing_partitions,
+                                 detach_survey_partition, drop_orphan_partitions,
+                                 is_partitioned)
+
+
+class Command(BaseCommand):
+    help = (
+        'Обслуживает секции таблицы ответов по опросам (ANSWER_PARTITIONING = "list"): создает недостающие '
+        'секции опросов и удаляет секции удаленных опросов. Ответы опроса можно убрать из таблицы ответов '
+        'отсоединением его секции (--detach) или ее удалением (--drop).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--convert',
+            action='store_true',
+            help='Преобразовать таблицу ответов в секционированную (запись ответов блокируется на время переноса).'
+        )
+        parser.add_argument(
+            '--detach',
+            type=int,
+            action='append',
+            default=[],
+            help='ID опроса, секция которого отсоединяется и остается отдельной таблицей (архив).'
+        )
+        parser.add_argument(
+            '--drop',
+            type=int,
+            action='append',
+            default=[],
+            help='ID опроса, секция которого отсоединяется и удаляется вместе с ответами.'
+        )
+
+    def handle(self, *args, **options):
+        if options['convert'] and convert_answer_table():
+            self.stdout.write('Таблица ответов преобразована в секционированную.')
+        if not is_partitioned():
+            raise CommandError('Таблица ответов не секционирована (используйте --convert).')
+
+        for survey_id in options['detach']:
+            self.detach(survey_id, drop=False)
+        for survey_id in options['drop']:
+            self.detach(survey_id, drop=True)
+        if options['detach'] or options['drop']:
+            return
+
+        created, skipped = create_missing_partitions()
+        for survey_id in created:
+            self.stdout.write(f'Создана секция опроса {survey_id}.')
+        for survey_id in skipped:
+            self.stdout.write(self.style.WARNING(
+                f'Секция опроса {survey_id} не создана: таблица ответов занята, повторите запуск позже.'
+            ))
+        for survey_id in drop_orphan_partitions():
+            self.stdout.write(f'Удалена секция удаленного опроса {survey_id}.')
+        self.stdout.write(self.style.SUCCESS('Секции ответов обновлены.'))
+
+    def detach(self, survey_id, drop):
+        partition = detach_survey_partition(survey_id, drop=drop)
+        if partition is None:
+            self.stdout.write(self.style.WARNING(f'У опроса {survey_id} нет секции.'))
+        elif drop:
+            self.stdout.write(f'Секция {partition} опроса {survey_id} удалена.')
+        else:
+            self.stdout.write(f'Секция {partition} опроса {survey_id} отсоединена.')
@@ -0,0 +1,54 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from survey.deletion import next_deletion, process_deletion
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет задания на удаление опросов (DELETE /api/v1/surveys/<id>/): сохраняет ответы в архив, '
+        'если он запрошен, удаляет ответы порциями и затем удаляет опрос.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.SURVEY_DELETION_BATCH_SIZE,
+            help='Число ответов, удаляемых одной транзакцией.'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=settings.SURVEY_DELETION_INTERVAL,
+            help='Пауза (в секундах) перед проверкой новых заданий, если заданий нет.'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выполнить все задания в очереди и завершиться.'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                deletion = next_deletion()
+                if deletion is None:
+                    if options['once']:
+                        return
+                    time.sleep(options['interval'])
+                    continue
+
+                try:
+                    process_deletion(deletion, options['batch_size'])
+                except Exception as error:
+                    self.stderr.write(f'Ошибка удаления опроса {deletion.survey_id}: {error!r}')
+                    continue
+                self.stdout.write(
+                    f'Опрос {deletion.survey_id} удален, ответов: {deletion.answers_deleted}'
+                    + (f', архив: {deletion.archive_path}.' if deletion.archive_path else '.')
+                )
+        except KeyboardInterrupt:
+            pass
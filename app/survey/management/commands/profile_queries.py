@@ -0,0 +1,65 @@
+import json
+import statistics
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from survey.benchmark import scenarios
+from survey.models import User
+
+API = '/api/v1'
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет сценарии нагрузочного теста внутри процесса и выводит число запросов к базе на один '
+        'запрос к API (JSON для bench/loadtest.py --queries).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('seed', help='JSON, записанный командой seed_benchmark.')
+        parser.add_argument('--requests', type=int, default=20, help='Число запросов в каждом сценарии.')
+        parser.add_argument('--host', default='localhost', help='Значение заголовка Host (из ALLOWED_HOSTS).')
+        parser.add_argument('--page-size', type=int, default=100, help='Размер страницы списка ответов.')
+        parser.add_argument('--scenario', action='append', help='Запускаемые сценарии (по умолчанию все).')
+        parser.add_argument('--output', default='-', help='Файл для записи результата или `-` для stdout.')
+
+    def handle(self, *args, **options):
+        with open(options['seed'], encoding='utf-8') as seed_file:
+            seed = json.load(seed_file)
+        try:
+            admin = User.objects.get(username=seed['admin']['username'])
+        except User.DoesNotExist:
+            raise CommandError('Администратор из файла не найден, выполните seed_benchmark.')
+        token = str(RefreshToken.for_user(admin).access_token)
+
+        result = {}
+        for name, (as_admin, method, build) in scenarios(API, seed, options['page_size']).items():
+            if options['scenario'] and name not in options['scenario']:
+                continue
+
+            client = APIClient(HTTP_HOST=options['host'])
+            if as_admin:
+                client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+            counts = []
+            for _ in range(options['requests']):
+                url, body = build()
+                with CaptureQueriesContext(connection) as context:
+                    response = getattr(client, method.lower())(url, body, format='json')
+                if response.status_code >= 400:
+                    raise CommandError(f'{name}: {method.upper()} {url} вернул {response.status_code}.')
+                counts.append(len(context))
+
+            result[name] = {'queries': statistics.mean(counts), 'queries_max': max(counts)}
+            self.stderr.write(f'{name:16} {result[name]["queries"]:6.1f} запросов (макс. {max(counts)})')
+
+        data = json.dumps(result, indent=2)
+        if options['output'] == '-':
+            self.stdout.write(data)
+        else:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                output.write(data)
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from survey.counters import expected_counters, rebuild_counters, stored_counters
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает счетчики ответов по таблице ответов или проверяет их расхождение с ней.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить расхождение счетчиков с таблицей ответов.'
+        )
+
+    def handle(self, *args, **options):
+        if not options['check']:
+            with transaction.atomic():
+                rebuild_counters()
+            self.stdout.write(self.style.SUCCESS('Счетчики ответов перестроены.'))
+            return
+
+        expected = expected_counters()
+        stored = stored_counters()
+
+        drift = sorted(
+            (key, expected.get(key, 0), stored.get(key, 0))
+            for key in expected.keys() | stored.keys()
+            if expected.get(key, 0) != stored.get(key, 0)
+        )
+        for (survey_id, question_id, anonym, choice), expected_count, stored_count in drift:
+            self.stdout.write(
+                f'survey={survey_id} question={question_id} anonym={anonym} choice={choice}: '
+                f'ожидается {expected_count}, сохранено {stored_count}'
+            )
+
+        if drift:
+            raise CommandError(f'Найдено расхождений: {len(drift)}.')
+        self.stdout.write(self.style.SUCCESS('Счетчики ответов совпадают с таблицей ответов.'))
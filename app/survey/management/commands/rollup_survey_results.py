@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from survey.rollup import closed_surveys, rollup_survey
+
+
+class Command(BaseCommand):
+    help = (
+        'Вычисляет и сохраняет итоги закрытых опросов (end_date прошла), по которым эндпоинт stat '
+        'отвечает без подсчета ответов. Предназначена для периодического запуска (cron).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Пересчитать итоги всех закрытых опросов, а не только опросов без итогов.'
+        )
+        parser.add_argument(
+            '--survey',
+            type=int,
+            action='append',
+            help='ID опроса (можно указать несколько раз); по умолчанию - все закрытые опросы.'
+        )
+
+    def handle(self, *args, **options):
+        survey_ids = closed_surveys(force=options['force'] or bool(options['survey']))
+        if options['survey']:
+            survey_ids = survey_ids.filter(id__in=options['survey'])
+
+        count = 0
+        for survey_id in survey_ids:
+            rollup_survey(survey_id)
+            count += 1
+            self.stdout.write(f'Итоги опроса {survey_id} сохранены.')
+        self.stdout.write(self.style.SUCCESS(f'Обработано опросов: {count}.'))
@@ -0,0 +1,139 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from survey.anonym import next_anonym_id, reserve_anonym_ids
+from survey.counters import rebuild_counters
+from survey.models import Answer, Question, QuestionSurvey, Survey, User
+
+ANSWERS_POOL_SIZE = 4
+
+# Ответы генерируются на стороне базы: каждый из K респондентов отвечает на все вопросы опроса.
+# Для вопросов с множественным выбором выбираются два случайных варианта (возможно, совпадающих);
+# подзапрос ссылается на respondent, иначе он вычисляется один раз на весь запрос.
+SEED_ANSWERS_SQL = f'''
+INSERT INTO {Answer._meta.db_table} (user_id, survey_id, question_id, text, choices, anonym_id)
+SELECT NULL, link.survey_id, link.question_id,
+    CASE WHEN question.answer_type = %(open)s THEN 'answer ' || respondent ELSE '' END,
+    CASE question.answer_type
+        WHEN %(open)s THEN NULL
+        WHEN %(single)s THEN ARRAY[floor(random() * %(pool)s)::int]
+        ELSE ARRAY(SELECT DISTINCT floor(random() * %(pool)s + 0 * respondent)::int FROM generate_series(1, 2))
+    END,
+    %(anonym_id)s + respondent
+FROM {QuestionSurvey._meta.db_table} AS link
+JOIN {Question._meta.db_table} AS question ON question.id = link.question_id
+CROSS JOIN generate_series(1, %(respondents)s) AS respondent
+WHERE link.survey_id = ANY(%(surveys)s)
+'''
+
+ANSWER_TYPES = (Question.SINGLE_CHOICE_ANSWER, Question.MULTIPLE_CHOICE_ANSWER, Question.OPEN_ANSWER)
+
+
+class Command(BaseCommand):
+    help = (
+        'Создает данные для нагрузочного теста: N опросов по M вопросов с K ответами на каждый вопрос, '
+        'и записывает их идентификаторы в JSON для bench/loadtest.py.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--surveys', type=int, default=10, help='Число опросов (N).')
+        parser.add_argument('--questions', type=int, default=10, help='Число вопросов в опросе (M).')
+        parser.add_argument('--answers', type=int, default=1000, help='Число ответов на вопрос (K).')
+        parser.add_argument('--prefix', default='bench', help='Префикс имен создаваемых опросов и пользователя.')
+        parser.add_argument('--password', default='bench', help='Пароль администратора для сценариев администратора.')
+        parser.add_argument('--output', default='-', help='Файл для записи идентификаторов или `-` для stdout.')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if Survey.objects.filter(name__startswith=f'{prefix}-').exists():
+            raise CommandError(f'Опросы с префиксом `{prefix}` уже существуют, укажите другой --prefix.')
+
+        started = time.monotonic()
+        with transaction.atomic():
+            admin = self.create_admin(prefix, options['password'])
+            surveys = self.create_surveys(prefix, options['surveys'], options['questions'])
+            answers = self.create_answers(surveys, options['answers'])
+            rebuild_counters()
+
+        seed = {
+            'admin': {'username': admin.username, 'password': options['password']},
+            'answers': options['answers'],
+            'surveys': [
+                {'id': survey.id, 'questions': [question.id for question in questions]}
+                for survey, questions in surveys
+            ],
+        }
+        data = json.dumps(seed, indent=2)
+        if options['output'] == '-':
+            self.stdout.write(data)
+        else:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                output.write(data)
+
+        self.stderr.write(self.style.SUCCESS(
+            f'Создано опросов: {len(surveys)}, ответов: {answers}, время: {time.monotonic() - started:.1f} с.'
+        ))
+
+    def create_admin(self, prefix, password):
+        admin, _ = User.objects.get_or_create(
+            username=f'{prefix}-admin', defaults={'is_staff': True, 'is_superuser': True}
+        )
+        admin.set_password(password)
+        admin.save()
+        return admin
+
+    def create_surveys(self, prefix, surveys_count, questions_count):
+        now = timezone.now()
+        surveys = Survey.objects.bulk_create(
+            Survey(
+                name=f'{prefix}-{number}',
+                description='Опрос для нагрузочного теста',
+                start_date=now.date(),
+                end_date=(now + timezone.timedelta(weeks=2)).date()
+            )
+            for number in range(surveys_count)
+        )
+        # тип вопроса задается его позицией в опросе: первый вопрос каждого опроса - с единственным
+        # вариантом ответа (на него отвечает сценарий answer-create)
+        questions = Question.objects.bulk_create(
+            Question(
+                text=f'{prefix} вопрос {number}',
+                answer_type=ANSWER_TYPES[number % questions_count % len(ANSWER_TYPES)],
+                answers_pool=(
+                    None if ANSWER_TYPES[number % questions_count % len(ANSWER_TYPES)] == Question.OPEN_ANSWER
+                    else [f'вариант {choice}' for choice in range(ANSWERS_POOL_SIZE)]
+                )
+            )
+            for number in range(surveys_count * questions_count)
+        )
+
+        surveys = [
+            (survey, questions[index * questions_count:(index + 1) * questions_count])
+            for index, survey in enumerate(surveys)
+        ]
+        QuestionSurvey.objects.bulk_create(
+            QuestionSurvey(survey=survey, question=question)
+            for survey, survey_questions in surveys
+            for question in survey_questions
+        )
+        return surveys
+
+    def create_answers(self, surveys, respondents):
+        # респонденты получают новые anonym_id из общей последовательности
+        anonym_id = next_anonym_id()
+        with connection.cursor() as cursor:
+            cursor.execute(SEED_ANSWERS_SQL, {
+                'open': Question.OPEN_ANSWER,
+                'single': Question.SINGLE_CHOICE_ANSWER,
+                'pool': ANSWERS_POOL_SIZE,
+                'anonym_id': anonym_id,
+                'respondents': respondents,
+                'surveys': [survey.id for survey, _ in surveys],
+            })
+            count = cursor.rowcount
+        reserve_anonym_ids(anonym_id + respondents)
+        return count
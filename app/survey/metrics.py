@@ -0,0 +1,130 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Гистограммы хранятся в памяти процесса: при нескольких воркерах gunicorn
+# каждый воркер отдает в /metrics собственные значения.
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERIES_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+HISTOGRAMS = {
+    'survey_request_duration_seconds': ('Время обработки запроса.', SECONDS_BUCKETS),
+    'survey_request_view_seconds': ('Время выполнения представления.', SECONDS_BUCKETS),
+    'survey_request_serializer_seconds': ('Время сериализации ответа.', SECONDS_BUCKETS),
+    'survey_request_db_seconds': ('Время запросов к базе данных.', SECONDS_BUCKETS),
+    'survey_request_db_queries': ('Число запросов к базе данных.', QUERIES_BUCKETS),
+}
+
+_local = threading.local()
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+        self.view_started = None
+        self.view_finished = None
+        self.view_time = 0.0
+        self.render_time = 0.0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # execute_wrapper соединения с базой данных
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.db_queries += 1
+
+    def values(self):
+        return {
+            'survey_request_duration_seconds': self.duration,
+            'survey_request_view_seconds': self.view_time,
+            'survey_request_serializer_seconds': self.serializer_time,
+            'survey_request_db_seconds': self.db_time,
+            'survey_request_db_queries': self.db_queries,
+        }
+
+
+def start_request():
+    _local.metrics = RequestMetrics()
+    return _local.metrics
+
+
+def finish_request():
+    _local.metrics = None
+
+
+def current_metrics():
+    return getattr(_local, 'metrics', None)
+
+
+@contextmanager
+def serializer_timer():
+    # учитывается только внешний вызов: вложенные сериализаторы уже входят в его время
+    metrics = current_metrics()
+    if metrics is None:
+        yield
+        return
+
+    metrics.serializer_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serializer_depth -= 1
+        if not metrics.serializer_depth:
+            metrics.serializer_time += time.perf_counter() - started
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = defaultdict(dict)
+
+    def observe(self, labels, metrics):
+        with self.lock:
+            for name, value in metrics.values().items():
+                histogram = self.histograms[name].get(labels)
+                if histogram is None:
+                    histogram = self.histograms[name][labels] = Histogram(HISTOGRAMS[name][1])
+                histogram.observe(value)
+
+    def render(self):
+        # текстовый формат Prometheus (exposition format 0.0.4)
+        lines = []
+        with self.lock:
+            for name, (description, _) in HISTOGRAMS.items():
+                lines.append(f'# HELP {name} {description}')
+                lines.append(f'# TYPE {name} histogram')
+                for labels, histogram in sorted(self.histograms[name].items(), key=lambda item: item[0]):
+                    label = ','.join(f'{key}="{value}"' for key, value in labels)
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        lines.append(f'{name}_bucket{{{label},le="{bound}"}} {count}')
+                    lines.append(f'{name}_bucket{{{label},le="+Inf"}} {histogram.count}')
+                    lines.append(f'{name}_sum{{{label}}} {histogram.sum}')
+                    lines.append(f'{name}_count{{{label}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
@@ -0,0 +1,69 @@
+import json
+import logging
+import time
+
+from django.db import connection
+
+from .metrics import finish_request, registry, start_request
+
+logger = logging.getLogger('survey.metrics')
+
+
+class RequestMetricsMiddleware:
+    # Собирает по каждому запросу число и время запросов к базе, время представления,
+    # сериализации и рендеринга. Значения отдаются в заголовке Server-Timing, пишутся
+    # в журнал и накапливаются в гистограммах по имени URL (survey-list, answer-stat, ...).
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = request._metrics = start_request()
+        try:
+            with connection.execute_wrapper(metrics):
+                response = self.get_response(request)
+        finally:
+            finish_request()
+
+        finished = time.perf_counter()
+        metrics.duration = finished - metrics.started
+        if metrics.view_started is not None and not metrics.view_time:
+            # ответ без отложенного рендеринга (HttpResponse, StreamingHttpResponse)
+            metrics.view_time = finished - metrics.view_started
+        elif metrics.view_finished is not None:
+            metrics.render_time = finished - metrics.view_finished
+
+        match = request.resolver_match
+        view = match.url_name if match is not None and match.url_name else 'unknown'
+        registry.observe((('method', request.method), ('view', view)), metrics)
+
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.db_queries} queries"',
+            f'view;dur={metrics.view_time * 1000:.1f}',
+            f'serializer;dur={metrics.serializer_time * 1000:.1f}',
+            f'render;dur={metrics.render_time * 1000:.1f}',
+            f'total;dur={metrics.duration * 1000:.1f}',
+        ))
+        logger.info(json.dumps({
+            'view': view,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(metrics.duration * 1000, 1),
+            'view_ms': round(metrics.view_time * 1000, 1),
+            'serializer_ms': round(metrics.serializer_time * 1000, 1),
+            'render_ms': round(metrics.render_time * 1000, 1),
+            'db_ms': round(metrics.db_time * 1000, 1),
+            'db_queries': metrics.db_queries,
+        }))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metrics.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # ответы DRF рендерятся после вызова process_template_response
+        metrics = request._metrics
+        if metrics.view_started is not None:
+            metrics.view_finished = time.perf_counter()
+            metrics.view_time = metrics.view_finished - metrics.view_started
+        return response
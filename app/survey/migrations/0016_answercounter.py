@@ -0,0 +1,46 @@
+# Generated by Django 2.2.16 on 2021-07-30 10:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+POPULATE_ANSWER_COUNTERS_SQL = '''
+INSERT INTO survey_answercounter (survey_id, question_id, anonym, choice, count)
+SELECT survey_id, question_id, user_id IS NULL, -1, COUNT(*)
+FROM survey_answer
+GROUP BY 1, 2, 3
+UNION ALL
+SELECT survey_id, question_id, user_id IS NULL, -2, COUNT(*)
+FROM survey_answer
+WHERE text <> ''
+GROUP BY 1, 2, 3
+UNION ALL
+SELECT survey_id, question_id, user_id IS NULL, choice, COUNT(*)
+FROM survey_answer, unnest(choices) AS choice
+GROUP BY 1, 2, 3, 4
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0015_auto_20210727_1627'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnswerCounter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('anonym', models.BooleanField(verbose_name='ответы анонимных пользователей')),
+                ('choice', models.SmallIntegerField(verbose_name='вариант ответа')),
+                ('count', models.IntegerField(default=0, verbose_name='число ответов')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answer_counters', to='survey.Question', verbose_name='вопрос')),
+                ('survey', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answer_counters', to='survey.Survey', verbose_name='опрос')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='answercounter',
+            constraint=models.UniqueConstraint(fields=('survey', 'question', 'anonym', 'choice'), name='unique_answer_counter'),
+        ),
+        migrations.RunSQL(POPULATE_ANSWER_COUNTERS_SQL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations
+
+# значение 0 зарезервировано для аутентифицированных пользователей
+CREATE_ANONYM_ID_SEQUENCE_SQL = '''
+CREATE SEQUENCE survey_answer_anonym_id_seq MINVALUE 1;
+SELECT setval('survey_answer_anonym_id_seq', COALESCE(MAX(anonym_id), 0) + 1, false) FROM survey_answer;
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0016_answercounter'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            CREATE_ANONYM_ID_SEQUENCE_SQL,
+            'DROP SEQUENCE survey_answer_anonym_id_seq;'
+        ),
+    ]
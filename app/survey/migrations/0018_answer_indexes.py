@@ -0,0 +1,62 @@
+# Generated by Django 2.2.16 on 2021-07-30 14:05
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+# Индексы создаются с CONCURRENTLY, чтобы не блокировать запись ответов
+# на время построения индексов по большой таблице.
+CREATE_INDEXES_SQL = [
+    'CREATE INDEX CONCURRENTLY IF NOT EXISTS "answer_sq_anonym_idx" '
+    'ON "survey_answer" ("survey_id", "question_id", "anonym_id");',
+    'CREATE INDEX CONCURRENTLY IF NOT EXISTS "answer_sq_user_idx" '
+    'ON "survey_answer" ("survey_id", "question_id", "user_id");',
+    'CREATE INDEX CONCURRENTLY IF NOT EXISTS "answer_sq_anonym_null_idx" '
+    'ON "survey_answer" ("survey_id", "question_id") WHERE "user_id" IS NULL;',
+    'CREATE INDEX CONCURRENTLY IF NOT EXISTS "answer_choices_gin_idx" '
+    'ON "survey_answer" USING gin ("choices");',
+]
+DROP_INDEXES_SQL = [
+    'DROP INDEX CONCURRENTLY IF EXISTS "answer_sq_anonym_idx";',
+    'DROP INDEX CONCURRENTLY IF EXISTS "answer_sq_user_idx";',
+    'DROP INDEX CONCURRENTLY IF EXISTS "answer_sq_anonym_null_idx";',
+    'DROP INDEX CONCURRENTLY IF EXISTS "answer_choices_gin_idx";',
+]
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('survey', '0017_anonym_id_sequence'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(create_sql, drop_sql)
+                for create_sql, drop_sql in zip(CREATE_INDEXES_SQL, DROP_INDEXES_SQL)
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='answer',
+                    index=models.Index(fields=['survey', 'question', 'anonym_id'], name='answer_sq_anonym_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='answer',
+                    index=models.Index(fields=['survey', 'question', 'user'], name='answer_sq_user_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='answer',
+                    index=models.Index(
+                        condition=models.Q(user__isnull=True),
+                        fields=['survey', 'question'],
+                        name='answer_sq_anonym_null_idx'
+                    ),
+                ),
+                migrations.AddIndex(
+                    model_name='answer',
+                    index=django.contrib.postgres.indexes.GinIndex(fields=['choices'], name='answer_choices_gin_idx'),
+                ),
+            ],
+        ),
+    ]
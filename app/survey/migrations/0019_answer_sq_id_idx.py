@@ -0,0 +1,30 @@
+# Generated by Django 2.2.16 on 2021-08-02 09:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('survey', '0018_answer_indexes'),
+    ]
+
+    operations = [
+        # индекс для курсорной пагинации ответов на вопрос по id
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    'CREATE INDEX CONCURRENTLY IF NOT EXISTS "answer_sq_id_idx" '
+                    'ON "survey_answer" ("survey_id", "question_id", "id");',
+                    'DROP INDEX CONCURRENTLY IF EXISTS "answer_sq_id_idx";'
+                ),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='answer',
+                    index=models.Index(fields=['survey', 'question', 'id'], name='answer_sq_id_idx'),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 2.2.16 on 2021-08-04 11:20
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0019_answer_sq_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingAnswer',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.IntegerField(blank=True, null=True)),
+                ('survey_id', models.IntegerField()),
+                ('question_id', models.IntegerField()),
+                ('text', models.TextField(blank=True)),
+                ('choices', django.contrib.postgres.fields.ArrayField(base_field=models.PositiveSmallIntegerField(), blank=True, null=True, size=None)),
+                ('anonym_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        # очередь не пишется в WAL; при аварийной остановке сервера БД ее содержимое теряется
+        migrations.RunSQL(
+            'ALTER TABLE survey_pendinganswer SET UNLOGGED;',
+            'ALTER TABLE survey_pendinganswer SET LOGGED;'
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 2.2.16 on 2021-08-06 15:32
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0020_pendinganswer'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SurveyResults',
+            fields=[
+                ('survey', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='results', serialize=False, to='survey.Survey', verbose_name='опрос')),
+                ('results', django.contrib.postgres.fields.jsonb.JSONField(verbose_name='итоги опроса')),
+                ('computed_at', models.DateTimeField(auto_now=True, verbose_name='время вычисления')),
+            ],
+        ),
+    ]
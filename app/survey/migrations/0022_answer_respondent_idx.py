@@ -0,0 +1,33 @@
+# Generated by Django 2.2.16 on 2021-08-09 12:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('survey', '0021_surveyresults'),
+    ]
+
+    operations = [
+        # индекс для группировки ответов опроса по респондентам (статистика опроса)
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    'CREATE INDEX CONCURRENTLY IF NOT EXISTS "answer_respondent_idx" '
+                    'ON "survey_answer" ("survey_id", "user_id", "anonym_id", "question_id");',
+                    'DROP INDEX CONCURRENTLY IF EXISTS "answer_respondent_idx";'
+                ),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='answer',
+                    index=models.Index(
+                        fields=['survey', 'user', 'anonym_id', 'question'],
+                        name='answer_respondent_idx'
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 2.2.16 on 2021-08-12 10:41
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+# Вектор вычисляется триггером, поэтому он заполняется при любой записи ответа,
+# включая bulk_create и COPY, а у ответов с вариантами (пустой текст) остается NULL.
+CREATE_SEARCH_TRIGGER_SQL = '''
+CREATE FUNCTION survey_answer_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := CASE WHEN NEW.text <> '' THEN to_tsvector('russian', NEW.text) END;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER survey_answer_search_vector
+BEFORE INSERT OR UPDATE OF text, search_vector ON survey_answer
+FOR EACH ROW EXECUTE PROCEDURE survey_answer_search_vector();
+'''
+DROP_SEARCH_TRIGGER_SQL = '''
+DROP TRIGGER survey_answer_search_vector ON survey_answer;
+DROP FUNCTION survey_answer_search_vector();
+'''
+BACKFILL_SEARCH_VECTOR_SQL = '''
+UPDATE survey_answer SET text = text
+WHERE id >= %s AND id < %s AND text <> '' AND search_vector IS NULL
+'''
+BACKFILL_BATCH_SIZE = 10000
+
+
+def backfill_search_vector(apps, schema_editor):
+    # существующие ответы обновляются порциями, каждая в своей транзакции
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('SELECT MIN(id), MAX(id) FROM survey_answer')
+        min_id, max_id = cursor.fetchone()
+        if min_id is None:
+            return
+        for start in range(min_id, max_id + 1, BACKFILL_BATCH_SIZE):
+            cursor.execute(BACKFILL_SEARCH_VECTOR_SQL, (start, start + BACKFILL_BATCH_SIZE))
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('survey', '0022_answer_respondent_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='answer',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(CREATE_SEARCH_TRIGGER_SQL, DROP_SEARCH_TRIGGER_SQL),
+        migrations.RunPython(backfill_search_vector, migrations.RunPython.noop),
+        # частичный индекс: ответы с вариантами в него не попадают
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    'CREATE INDEX CONCURRENTLY IF NOT EXISTS "answer_search_vector_idx" '
+                    'ON "survey_answer" USING gin ("search_vector") WHERE "search_vector" IS NOT NULL;',
+                    'DROP INDEX CONCURRENTLY IF EXISTS "answer_search_vector_idx";'
+                ),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='answer',
+                    index=django.contrib.postgres.indexes.GinIndex(
+                        condition=models.Q(search_vector__isnull=False),
+                        fields=['search_vector'],
+                        name='answer_search_vector_idx'
+                    ),
+                ),
+            ],
+        ),
+    ]
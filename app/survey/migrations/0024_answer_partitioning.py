@@ -0,0 +1,14 @@
+# Generated by Django 2.2.16 on 2021-08-16 09:27
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Схема, которую дает миграция, не зависит от окружения: таблица ответов преобразуется
+    # в секционированную только командой partition_answers --convert (ANSWER_PARTITIONING = 'list').
+
+    dependencies = [
+        ('survey', '0023_answer_search_vector'),
+    ]
+
+    operations = []
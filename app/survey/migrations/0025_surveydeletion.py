@@ -0,0 +1,34 @@
+# Generated by Django 2.2.16 on 2021-08-16 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0024_answer_partitioning'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SurveyDeletion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('survey_id', models.IntegerField(verbose_name='ID опроса')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('done', 'Выполнено'), ('failed', 'Ошибка')], default='pending', max_length=8, verbose_name='состояние')),
+                ('archive', models.BooleanField(default=False, verbose_name='сохранить ответы в архив')),
+                ('archive_path', models.CharField(blank=True, max_length=255, verbose_name='файл архива ответов')),
+                ('answers_total', models.IntegerField(blank=True, null=True, verbose_name='число ответов опроса')),
+                ('answers_deleted', models.IntegerField(default=0, verbose_name='удалено ответов')),
+                ('error', models.TextField(blank=True, verbose_name='ошибка')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='surveydeletion',
+            constraint=models.UniqueConstraint(condition=models.Q(status__in=('pending', 'running')), fields=('survey_id',), name='unique_active_survey_deletion'),
+        ),
+    ]
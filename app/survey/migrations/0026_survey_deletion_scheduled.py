@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2021-08-17 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0025_surveydeletion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='survey',
+            name='deletion_scheduled',
+            field=models.BooleanField(default=False, editable=False, verbose_name='запланировано удаление'),
+        ),
+    ]
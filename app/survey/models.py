@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
-from django.contrib.postgres.fields import ArrayField
-from django.db import models
+from django.contrib.postgres.fields import ArrayField, JSONField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
 from django.utils import timezone
 
 from .validators import validate_answers_pool, validate_choices
@@ -93,6 +95,12 @@ class Survey(models.Model):
     end_date = models.DateField(
         'дата конца опроса'
     )
+    # опрос ждет удаления командой process_survey_deletions и скрыт из API
+    deletion_scheduled = models.BooleanField(
+        'запланировано удаление',
+        default=False,
+        editable=False
+    )
     questions = models.ManyToManyField(
         Question,
         through='QuestionSurvey'
@@ -153,8 +161,158 @@ class Answer(models.Model):
         validators=[validate_choices]
     )
     anonym_id = models.PositiveIntegerField(blank=True, null=True)
+    # заполняется триггером базы данных по тексту свободного ответа (см. survey.search)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    def save(self, *args, **kwargs):
+        # ответ и его счетчики (сигналы pre_save и post_save) меняются в одной транзакции,
+        # иначе блокировка прежнего состояния ответа в pre_save снимется до обновления счетчиков
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            return super().save(*args, **kwargs)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=('survey', 'question', 'anonym_id'),
+                name='answer_sq_anonym_idx'
+            ),
+            models.Index(
+                fields=('survey', 'question', 'user'),
+                name='answer_sq_user_idx'
+            ),
+            models.Index(
+                fields=('survey', 'question'),
+                name='answer_sq_anonym_null_idx',
+                condition=models.Q(user__isnull=True)
+            ),
+            models.Index(
+                fields=('survey', 'question', 'id'),
+                name='answer_sq_id_idx'
+            ),
+            models.Index(
+                fields=('survey', 'user', 'anonym_id', 'question'),
+                name='answer_respondent_idx'
+            ),
+            GinIndex(fields=('choices',), name='answer_choices_gin_idx'),
+            GinIndex(
+                fields=('search_vector',),
+                name='answer_search_vector_idx',
+                condition=models.Q(search_vector__isnull=False)
+            ),
+        ]
 
     def __str__(self):
         if self.question.question_type == Question.OPEN:
             return self.text
         return self.selected_answers
+
+
+class PendingAnswer(models.Model):
+    # Очередь принятых, но еще не записанных ответов (режим ANSWER_INGESTION_MODE = 'queue').
+    # Ссылки хранятся без внешних ключей, чтобы запись в очередь не проверяла ограничения.
+    user_id = models.IntegerField(blank=True, null=True)
+    survey_id = models.IntegerField()
+    question_id = models.IntegerField()
+    text = models.TextField(blank=True)
+    choices = ArrayField(
+        models.PositiveSmallIntegerField(),
+        blank=True,
+        null=True
+    )
+    anonym_id = models.PositiveIntegerField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+class AnswerCounter(models.Model):
+    # служебные значения choice: общее число ответов и число свободных ответов
+    ANSWERS_TOTAL = -1
+    TEXT_ANSWERS = -2
+
+    survey = models.ForeignKey(
+        Survey,
+        verbose_name='опрос',
+        on_delete=models.CASCADE,
+        related_name='answer_counters',
+    )
+    question = models.ForeignKey(
+        Question,
+        verbose_name='вопрос',
+        on_delete=models.CASCADE,
+        related_name='answer_counters',
+    )
+    anonym = models.BooleanField('ответы анонимных пользователей')
+    choice = models.SmallIntegerField('вариант ответа')
+    count = models.IntegerField('число ответов', default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('survey', 'question', 'anonym', 'choice'),
+                name='unique_answer_counter'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.survey_id}/{self.question_id}/{self.anonym}/{self.choice}: {self.count}'
+
+
+class SurveyResults(models.Model):
+    # Итоги закрытого опроса (end_date прошла), вычисляемые командой rollup_survey_results.
+    # Удаляются при записи ответов в опрос и при продлении опроса.
+    survey = models.OneToOneField(
+        Survey,
+        verbose_name='опрос',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='results',
+    )
+    results = JSONField('итоги опроса')
+    computed_at = models.DateTimeField('время вычисления', auto_now=True)
+
+    def __str__(self):
+        return f'{self.survey_id}: {self.computed_at}'
+
+
+class SurveyDeletion(models.Model):
+    # Задание на удаление опроса (SurveyViewSet.destroy), которое выполняет команда
+    # process_survey_deletions. Опрос удаляется после его ответов, поэтому ссылка - без внешнего ключа.
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнено'),
+        (FAILED, 'Ошибка'),
+    ]
+    ACTIVE_STATUSES = (PENDING, RUNNING)
+
+    survey_id = models.IntegerField('ID опроса')
+    status = models.CharField(
+        'состояние',
+        max_length=8,
+        choices=STATUS_CHOICES,
+        default=PENDING
+    )
+    archive = models.BooleanField('сохранить ответы в архив', default=False)
+    archive_path = models.CharField('файл архива ответов', max_length=255, blank=True)
+    answers_total = models.IntegerField('число ответов опроса', blank=True, null=True)
+    answers_deleted = models.IntegerField('удалено ответов', default=0)
+    error = models.TextField('ошибка', blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('survey_id',),
+                condition=models.Q(status__in=('pending', 'running')),
+                name='unique_active_survey_deletion'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.survey_id}: {self.status}'
@@ -0,0 +1,201 @@
+import json
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.compat import coreapi, coreschema
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, PageNumberPagination
+from rest_framework.utils.urls import replace_query_param
+
+
+def estimate_count(queryset):
+    # оценка числа строк планировщиком (по статистике pg_class.reltuples и гистограммам столбцов)
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPage(Page):
+    has_next_page = False
+
+    def has_next(self):
+        return self.has_next_page
+
+
+class EstimatedCountPaginator(DjangoPaginator):
+    # Число объектов оценивается планировщиком, поэтому номер страницы с ним не сверяется,
+    # а наличие следующей страницы определяется выборкой одного лишнего объекта.
+    @cached_property
+    def count(self):
+        return estimate_count(self.object_list)
+
+    def validate_number(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        object_list = list(self.object_list[bottom:bottom + self.per_page + 1])
+
+        page = EstimatedCountPage(object_list[:self.per_page], number, self)
+        page.has_next_page = len(object_list) > self.per_page
+        return page
+
+
+class KeysetCursorPagination(CursorPagination):
+    # Курсор хранит значения всех полей упорядочивания крайнего объекта страницы, и соседняя
+    # страница выбирается сравнением строк (a, b) > (%s, %s) без OFFSET. Поля упорядочивания
+    # задаются по возрастанию, не допускают NULL, а их сочетание должно быть уникальным.
+    def paginate_queryset(self, queryset, request, view=None):
+        if isinstance(self.ordering, str):
+            self.ordering = (self.ordering,)
+        opts = queryset.model._meta
+        self.fields = [opts.pk if name == 'pk' else opts.get_field(name) for name in self.ordering]
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+
+        reverse = self.cursor is not None and self.cursor.reverse
+        queryset = queryset.order_by(*(('-' if reverse else '') + name for name in self.ordering))
+        if self.cursor is not None:
+            quote_name = connections[queryset.db].ops.quote_name
+            columns = ', '.join(f'{quote_name(opts.db_table)}.{quote_name(field.column)}' for field in self.fields)
+            placeholders = ', '.join(['%s'] * len(self.fields))
+            queryset = queryset.extra(
+                where=[f'({columns}) {"<" if reverse else ">"} ({placeholders})'],
+                params=self.cursor.position
+            )
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+        return self.page
+
+    def get_position(self, obj):
+        return [field.value_to_string(obj) for field in self.fields]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        position = self.get_position(self.page[-1]) if self.page else self.cursor.position
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        position = self.get_position(self.page[0]) if self.page else self.cursor.position
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            data = json.loads(b64decode(encoded.encode('ascii')).decode('ascii'))
+            values = data['p']
+            if len(values) != len(self.fields):
+                raise ValueError('Cursor does not match the ordering')
+            position = [field.to_python(value) for field, value in zip(self.fields, values)]
+            reverse = bool(data['r'])
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return Cursor(offset=0, reverse=reverse, position=position)
+
+    def encode_cursor(self, cursor):
+        position = [str(value) for value in cursor.position]
+        data = json.dumps({'r': int(cursor.reverse), 'p': position})
+        encoded = b64encode(data.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+
+class SurveyPagination(PageNumberPagination):
+    # Постраничная пагинация по умолчанию и курсорная (keyset) пагинация по запросу.
+    # Курсорная пагинация не выполняет COUNT(*) и OFFSET, поэтому стоимость глубоких
+    # страниц не отличается от первой. Уникальное сочетание полей упорядочивания задается
+    # атрибутом cursor_ordering представления.
+    pagination_query_param = 'pagination'
+    count_query_param = 'count'
+    default_cursor_ordering = 'pk'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.queryset = queryset
+        self.request = request
+        self.cursor_paginator = None
+
+        if self.is_cursor_requested(request):
+            self.cursor_paginator = KeysetCursorPagination()
+            self.cursor_paginator.page_size = self.page_size
+            self.cursor_paginator.ordering = getattr(view, 'cursor_ordering', self.default_cursor_ordering)
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+
+        if self.is_count_estimated(request):
+            self.django_paginator_class = EstimatedCountPaginator
+        return super().paginate_queryset(queryset, request, view)
+
+    def is_cursor_requested(self, request):
+        return (
+            request.query_params.get(self.pagination_query_param) == 'cursor'
+            or CursorPagination.cursor_query_param in request.query_params
+        )
+
+    def is_count_estimated(self, request):
+        return request.query_params.get(self.count_query_param) == 'estimate'
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is None:
+            return super().get_paginated_response(data)
+
+        response = self.cursor_paginator.get_paginated_response(data)
+        if self.is_count_estimated(self.request):
+            response.data = OrderedDict([('count', estimate_count(self.queryset)), *response.data.items()])
+        return response
+
+    def get_schema_fields(self, view):
+        assert coreapi is not None, 'coreapi must be installed to use `get_schema_fields()`'
+        assert coreschema is not None, 'coreschema must be installed to use `get_schema_fields()`'
+        return super().get_schema_fields(view) + [
+            coreapi.Field(
+                name=self.pagination_query_param,
+                required=False,
+                location='query',
+                schema=coreschema.String(
+                    title='Pagination',
+                    description='Значение `cursor` включает курсорную пагинацию.'
+                )
+            ),
+            coreapi.Field(
+                name=CursorPagination.cursor_query_param,
+                required=False,
+                location='query',
+                schema=coreschema.String(
+                    title='Cursor',
+                    description='Курсор страницы из ссылок `next`/`previous` курсорной пагинации.'
+                )
+            ),
+            coreapi.Field(
+                name=self.count_query_param,
+                required=False,
+                location='query',
+                schema=coreschema.String(
+                    title='Count',
+                    description='Значение `estimate` заменяет точный подсчет числа объектов оценкой планировщика.'
+                )
+            ),
+        ]
@@ -0,0 +1,180 @@
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+
+from .models import Answer, Survey
+
+# Секционирование таблицы ответов списком по survey_id (ANSWER_PARTITIONING = 'list'):
+# у каждого опроса своя секция survey_answer_s<id>, ответы опросов без секции попадают
+# в секцию по умолчанию. Запросы с условием на опрос читают только его секцию, а ответы
+# удаляемого или архивируемого опроса убираются отсоединением секции вместо DELETE.
+ANSWER_TABLE = Answer._meta.db_table
+PARTITION_TABLE = ANSWER_TABLE + '_s{}'
+DEFAULT_PARTITION_TABLE = ANSWER_TABLE + '_default'
+
+# Первичный ключ секционированной таблицы обязан содержать ключ секционирования.
+# Уникальность id по-прежнему обеспечивает последовательность.
+CONVERT_SQL = '''
+LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE;
+CREATE TABLE {table}_partitioned (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+    PARTITION BY LIST (survey_id);
+CREATE TABLE {default} PARTITION OF {table}_partitioned DEFAULT;
+'''
+CONVERT_PARTITION_SQL = 'CREATE TABLE {partition} PARTITION OF {table}_partitioned FOR VALUES IN (%s)'
+SWAP_SQL = '''
+INSERT INTO {table}_partitioned SELECT * FROM {table};
+ALTER SEQUENCE {table}_id_seq OWNED BY {table}_partitioned.id;
+DROP TABLE {table};
+ALTER TABLE {table}_partitioned RENAME TO {table};
+ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, survey_id);
+'''
+# индексы, внешние ключи и триггеры переносятся со старой таблицы по их определениям
+TABLE_OBJECTS_SQL = '''
+SELECT pg_get_indexdef(indexrelid) FROM pg_index
+WHERE indrelid = %(table)s::regclass AND NOT indisprimary
+UNION ALL
+SELECT format('ALTER TABLE {table} ADD CONSTRAINT %%I %%s', conname, pg_get_constraintdef(oid)) FROM pg_constraint
+WHERE conrelid = %(table)s::regclass AND contype = 'f'
+UNION ALL
+SELECT pg_get_triggerdef(oid) FROM pg_trigger
+WHERE tgrelid = %(table)s::regclass AND NOT tgisinternal
+'''
+# Секция создается отдельной таблицей и присоединяется, а ответы опроса из секции по умолчанию
+# переносятся в нее. Ограничение CHECK избавляет от проверки строк новой секции, но ATTACH PARTITION
+# берет ACCESS EXCLUSIVE на секцию по умолчанию и просматривает ее целиком: до конца транзакции
+# блокируется запись ответов всех опросов без своей секции. Поэтому секции создает команда
+# partition_answers вне запросов к API, а ожидание блокировок ограничено PARTITION_LOCK_TIMEOUT.
+CREATE_PARTITION_SQL = '''
+CREATE TABLE {partition} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS);
+WITH moved AS (DELETE FROM {default} WHERE survey_id = %(survey_id)s RETURNING *)
+INSERT INTO {partition} SELECT * FROM moved;
+ALTER TABLE {partition} ADD CONSTRAINT {partition}_survey_check CHECK (survey_id = %(survey_id)s);
+ALTER TABLE {table} ATTACH PARTITION {partition} FOR VALUES IN (%(survey_id)s);
+ALTER TABLE {partition} DROP CONSTRAINT {partition}_survey_check;
+'''
+ARCHIVE_FOREIGN_KEYS_SQL = "SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'"
+# ATTACH и DETACH PARTITION блокируют таблицу ответов (или секцию по умолчанию): при долгих
+# запросах к ней операция прерывается, а не выстраивает за собой очередь из запросов записи ответов
+PARTITION_LOCK_TIMEOUT = '5s'
+
+
+def partitioning_enabled():
+    return settings.ANSWER_PARTITIONING == 'list'
+
+
+def is_partitioned():
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT relkind FROM pg_class WHERE oid = %s::regclass', [ANSWER_TABLE])
+        return cursor.fetchone()[0] == 'p'
+
+
+def survey_partitions(archived=False):
+    # {survey_id: имя секции} для присоединенных секций опросов или, при archived=True,
+    # для отсоединенных секций, оставшихся отдельными таблицами
+    if archived:
+        sql = (
+            "SELECT relname FROM pg_class WHERE relkind = 'r' AND relname LIKE %s "
+            "AND NOT relispartition AND pg_table_is_visible(oid)"
+        )
+        params = [PARTITION_TABLE.format('%')]
+    else:
+        sql = 'SELECT relname FROM pg_inherits JOIN pg_class ON pg_class.oid = inhrelid WHERE inhparent = %s::regclass'
+        params = [ANSWER_TABLE]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        names = [name for name, in cursor.fetchall()]
+
+    prefix = PARTITION_TABLE.format('')
+    return {
+        int(name[len(prefix):]): name for name in names
+        if name.startswith(prefix) and name[len(prefix):].isdigit()
+    }
+
+
+@transaction.atomic
+def convert_answer_table():
+    # Таблица ответов заменяется секционированной с копированием всех ответов; на время
+    # переноса запись и чтение ответов заблокированы. Возвращает False, если таблица уже секционирована.
+    if is_partitioned():
+        return False
+
+    names = {'table': ANSWER_TABLE, 'default': DEFAULT_PARTITION_TABLE}
+    with connection.cursor() as cursor:
+        cursor.execute(CONVERT_SQL.format(**names))
+        # секции существующих опросов создаются до копирования, чтобы ответы сразу попали в них
+        for survey_id in Survey.objects.order_by('id').values_list('id', flat=True):
+            cursor.execute(
+                CONVERT_PARTITION_SQL.format(partition=PARTITION_TABLE.format(survey_id), **names),
+                [survey_id]
+            )
+        cursor.execute(TABLE_OBJECTS_SQL.format(**names), {'table': ANSWER_TABLE})
+        table_objects = [definition for definition, in cursor.fetchall()]
+        cursor.execute(SWAP_SQL.format(**names))
+        for definition in table_objects:
+            cursor.execute(definition)
+        cursor.execute(f'ANALYZE {ANSWER_TABLE}')
+    return True
+
+
+@transaction.atomic
+def create_survey_partition(survey_id):
+    if survey_id in survey_partitions():
+        return False
+
+    with connection.cursor() as cursor:
+        cursor.execute('SET LOCAL lock_timeout = %s', [PARTITION_LOCK_TIMEOUT])
+        cursor.execute(CREATE_PARTITION_SQL.format(
+            table=ANSWER_TABLE,
+            partition=PARTITION_TABLE.format(survey_id),
+            default=DEFAULT_PARTITION_TABLE
+        ), {'survey_id': survey_id})
+    return True
+
+
+def create_missing_partitions():
+    # Ответы опросов с архивной секцией пишутся в секцию по умолчанию. Секция, которую не удалось
+    # присоединить за PARTITION_LOCK_TIMEOUT, создается при следующем запуске.
+    existing = {**survey_partitions(), **survey_partitions(archived=True)}
+    created, skipped = [], []
+    for survey_id in Survey.objects.order_by('id').values_list('id', flat=True):
+        if survey_id in existing:
+            continue
+        try:
+            create_survey_partition(survey_id)
+        except OperationalError:
+            skipped.append(survey_id)
+        else:
+            created.append(survey_id)
+    return created, skipped
+
+
+def drop_orphan_partitions():
+    # секции удаленных опросов (их ответы удалены вместе с опросом)
+    survey_ids = set(Survey.objects.values_list('id', flat=True))
+    orphans = [survey_id for survey_id in survey_partitions() if survey_id not in survey_ids]
+    for survey_id in orphans:
+        detach_survey_partition(survey_id, drop=True)
+    return orphans
+
+
+@transaction.atomic
+def detach_survey_partition(survey_id, drop=False):
+    # Ответы опроса убираются из таблицы ответов за время, не зависящее от их числа.
+    # Отсоединенная секция остается отдельной таблицей (архив), если drop=False;
+    # drop=True удаляет и ранее отсоединенную секцию. Счетчики ответов и итоги опроса не меняются.
+    partition = survey_partitions().get(survey_id)
+    archived = survey_partitions(archived=True).get(survey_id) if drop else None
+    if partition is None and archived is None:
+        return None
+
+    with connection.cursor() as cursor:
+        if partition is not None:
+            cursor.execute('SET LOCAL lock_timeout = %s', [PARTITION_LOCK_TIMEOUT])
+            cursor.execute(f'ALTER TABLE {ANSWER_TABLE} DETACH PARTITION {partition}')
+        if drop:
+            cursor.execute(f'DROP TABLE {partition or archived}')
+        else:
+            # архив не должен мешать удалению опроса, вопросов и пользователей
+            cursor.execute(ARCHIVE_FOREIGN_KEYS_SQL, [partition])
+            for constraint, in cursor.fetchall():
+                cursor.execute(f'ALTER TABLE {partition} DROP CONSTRAINT {constraint}')
+    return partition or archived
@@ -1,6 +1,11 @@
 from rest_framework import permissions
 
 
+def is_author(request, obj):
+    # сравнение по id не загружает автора ответа из базы
+    return request.user.is_authenticated and request.user.id == obj.user_id
+
+
 class AnswerPermission(permissions.BasePermission):
     def has_permission(self, request, view):
         if request.method == 'POST':
@@ -23,9 +28,9 @@ class AnswerPermission(permissions.BasePermission):
 
         if is_admin:
             if request.method in ['PUT', 'PATCH']:
-                return request.user == obj.user
+                return is_author(request, obj)
             return True
-        return request.user == obj.user
+        return is_author(request, obj)
 
 
 class IsAdminOrReadOnly(permissions.BasePermission):
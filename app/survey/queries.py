@@ -0,0 +1,139 @@
+import logging
+import re
+import sys
+import time
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+from rest_framework.fields import Field
+
+logger = logging.getLogger('survey.queries')
+
+# значения, которые отличают структурно одинаковые запросы
+NORMALIZE_PATTERNS = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+\b'), '?'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(?)'),
+    (re.compile(r'\s+'), ' '),
+)
+STACK_LIMIT = 8
+
+
+class QueryProblem(AssertionError):
+    pass
+
+
+def normalize_sql(sql):
+    for pattern, replacement in NORMALIZE_PATTERNS:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def serializer_field():
+    # поле сериализатора, при чтении которого выполняется запрос:
+    # Serializer.to_representation перебирает поля в локальной переменной field
+    frame = sys._getframe(1)
+    while frame is not None:
+        field = frame.f_locals.get('field')
+        if frame.f_code.co_name == 'to_representation' and isinstance(field, Field):
+            return f'{type(frame.f_locals["self"]).__name__}.{field.field_name}'
+        frame = frame.f_back
+    return None
+
+
+def project_stack():
+    # стек без кадров Django, DRF и других установленных пакетов
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if 'site-packages' not in frame.filename and frame.filename != __file__
+    ]
+    return ''.join(traceback.format_list(frames[-STACK_LIMIT:]))
+
+
+class QueryDetector:
+    # Ищет в запросах к базе, выполненных за один запрос к API, повторяющиеся
+    # структурно одинаковые запросы (N+1) и запросы дольше порога.
+    def __init__(self, repeat_threshold=None, slow_ms=None):
+        if repeat_threshold is None:
+            repeat_threshold = settings.QUERY_DETECTOR_REPEAT_THRESHOLD
+        if repeat_threshold < 1:
+            raise ValueError('repeat_threshold should be at least 1.')
+        self.repeat_threshold = repeat_threshold
+        self.slow_ms = settings.QUERY_DETECTOR_SLOW_MS if slow_ms is None else slow_ms
+        self.counts = Counter()
+        self.samples = {}
+        self.problems = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - started) * 1000
+            template = normalize_sql(sql)
+            self.counts[template] += 1
+
+            count = self.counts[template]
+            # первый повтор запоминается: при пороге 1 он же и становится проблемой
+            if count == 2:
+                self.samples[template] = (serializer_field(), project_stack())
+            if count == self.repeat_threshold + 1:
+                field, stack = self.samples[template]
+                self.problems.append({'kind': 'n+1', 'sql': template, 'field': field, 'stack': stack})
+            if duration > self.slow_ms:
+                self.problems.append({
+                    'kind': 'slow', 'sql': template, 'duration_ms': round(duration, 1),
+                    'field': serializer_field(), 'stack': project_stack(),
+                })
+
+    def report(self, view, mode):
+        if not self.problems:
+            return
+
+        messages = []
+        for problem in self.problems:
+            if problem['kind'] == 'n+1':
+                summary = f'N+1: запрос выполнен {self.counts[problem["sql"]]} раз'
+            else:
+                summary = f'медленный запрос: {problem["duration_ms"]} мс'
+            messages.append(
+                f'{view}: {summary}, поле сериализатора: {problem["field"] or "-"}\n'
+                f'{problem["sql"]}\n{problem["stack"]}'
+            )
+
+        if mode == 'raise':
+            raise QueryProblem('\n'.join(messages))
+        for message in messages:
+            logger.warning(message)
+
+
+@contextmanager
+def detect_queries(view='-', mode='raise', repeat_threshold=None, slow_ms=None):
+    # для тестов:
+    #   with detect_queries():
+    #       client.get(url)
+    detector = QueryDetector(repeat_threshold, slow_ms)
+    with connection.execute_wrapper(detector):
+        yield detector
+    detector.report(view, mode)
+
+
+class QueryDetectorMiddleware:
+    # QUERY_DETECTOR = 'log' пишет найденные проблемы в журнал survey.queries,
+    # 'raise' - прерывает запрос исключением QueryProblem (для тестов).
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        detector = QueryDetector()
+        with connection.execute_wrapper(detector):
+            response = self.get_response(request)
+
+        match = request.resolver_match
+        view = match.url_name if match is not None and match.url_name else request.path
+        detector.report(f'{request.method} {view}', settings.QUERY_DETECTOR)
+        return response
@@ -0,0 +1,33 @@
+import csv
+import io
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+# Рендереры нужны для выбора формата выгрузки параметром `format`: сами строки
+# выгрузки отдаются потоком, а рендереры используются только для ответов с ошибками.
+class CSVRenderer(BaseRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data.items() if isinstance(data, dict) else [[data]]
+
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue().encode(self.charset)
+
+
+class NDJSONRenderer(BaseRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return (json.dumps(data, ensure_ascii=False) + '\n').encode(self.charset)
@@ -0,0 +1,67 @@
+import datetime
+
+from django.contrib.postgres.fields.jsonb import KeyTransform
+from django.db import transaction
+
+from .models import Answer, Survey, SurveyResults
+from .stats import survey_stats
+
+# разбивка статистики в итогах опроса по значению фильтра anonym
+RESULTS_SPLITS = {
+    None: 'total',
+    True: 'anonym',
+    False: 'authenticated',
+}
+
+
+def is_closed(survey):
+    return survey.end_date < datetime.date.today()
+
+
+def compute_results(survey_id):
+    # статистика опроса (эндпоинт surveys/<id>/stats) для каждого значения фильтра anonym
+    answers = Answer.objects.filter(survey_id=survey_id)
+    return {
+        split: survey_stats(answers if anonym is None else answers.filter(user__isnull=anonym), survey_id)
+        for anonym, split in RESULTS_SPLITS.items()
+    }
+
+
+def rollup_survey(survey_id):
+    with transaction.atomic():
+        # FOR UPDATE на строке опроса несовместим с FOR KEY SHARE, который берет вставка ответа
+        # (проверка внешнего ключа), поэтому ответы не попадут в опрос во время вычисления итогов
+        survey = Survey.objects.select_for_update().get(id=survey_id)
+        return SurveyResults.objects.update_or_create(
+            survey=survey,
+            defaults={'results': compute_results(survey.id)}
+        )[0]
+
+
+def closed_surveys(force=False):
+    surveys = Survey.objects.filter(end_date__lt=datetime.date.today())
+    if not force:
+        surveys = surveys.filter(results__isnull=True)
+    return surveys.order_by('id').values_list('id', flat=True)
+
+
+def read_results(survey_id, *path):
+    # из итогов читается только нужная часть документа: results #> path
+    value = 'results'
+    for key in path:
+        value = KeyTransform(str(key), value)
+    results = SurveyResults.objects.filter(survey_id=survey_id).annotate(value=value)
+    # упорядочивание по survey (как в first() по умолчанию) добавило бы соединение с таблицей опросов
+    return results.order_by('survey_id').values_list('value', flat=True).first()
+
+
+def results_stat(survey_id, question_id, anonym=None):
+    return read_results(survey_id, RESULTS_SPLITS[anonym], 'questions', question_id)
+
+
+def results_stats(survey_id, anonym=None):
+    return read_results(survey_id, RESULTS_SPLITS[anonym])
+
+
+def invalidate_results(survey_ids):
+    SurveyResults.objects.filter(survey_id__in=survey_ids).delete()
@@ -0,0 +1,26 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, Func, TextField, Value
+
+# Конфигурация полнотекстового поиска. Вектор search_vector ответа вычисляется
+# триггером базы данных (миграция 0023) с той же конфигурацией.
+SEARCH_CONFIG = 'russian'
+HEADLINE_OPTIONS = 'StartSel=<b>, StopSel=</b>, MaxFragments=2, MaxWords=20, MinWords=5'
+
+
+class Headline(Func):
+    # ts_headline: фрагменты текста с выделенными найденными словами
+    function = 'ts_headline'
+    output_field = TextField()
+
+    def __init__(self, expression, query, options=HEADLINE_OPTIONS):
+        super().__init__(Value(SEARCH_CONFIG), expression, query, Value(options))
+
+
+def search_answers(queryset, text):
+    # ответы, текст которых содержит все слова запроса (с учетом словоформ),
+    # в порядке убывания релевантности
+    query = SearchQuery(text, config=SEARCH_CONFIG)
+    return queryset.filter(search_vector=query).annotate(
+        rank=SearchRank(F('search_vector'), query),
+        headline=Headline('text', query),
+    ).order_by('-rank', 'id')
@@ -1,15 +1,58 @@
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
 from rest_framework import serializers
 
-from .models import Answer, Category, Question, Survey
+from .metrics import serializer_timer
+from .models import Answer, Category, Question, Survey, SurveyDeletion
+
+
+# связи модели, которые сериализатор читает у каждого объекта
+@lru_cache(maxsize=None)
+def related_lookups(serializer_class):
+    model = serializer_class.Meta.model
+    select_related, prefetch_related = [], []
+
+    for field in serializer_class().fields.values():
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            continue
+        if not model_field.is_relation:
+            continue
+
+        if model_field.many_to_many or model_field.one_to_many:
+            prefetch_related.append(field.source)
+        elif not isinstance(field, serializers.PrimaryKeyRelatedField):
+            # для PrimaryKeyRelatedField достаточно значения внешнего ключа
+            select_related.append(field.source)
+
+    return tuple(select_related), tuple(prefetch_related)
+
+
+def eager_loading(queryset, serializer_class):
+    select_related, prefetch_related = related_lookups(serializer_class)
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+    if prefetch_related:
+        queryset = queryset.prefetch_related(*prefetch_related)
+    return queryset
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class TimedSerializerMixin:
+    # время сериализации учитывается в метриках запроса (REQUEST_METRICS)
+    def to_representation(self, instance):
+        with serializer_timer():
+            return super().to_representation(instance)
+
+
+class CategorySerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ('id', 'name', 'slug')
 
 
-class QuestionSerializer(serializers.ModelSerializer):
+class QuestionSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     def validate(self, data):
         answer_type = data['answer_type']
         answers_pool = data.get('answers_pool')
@@ -27,7 +70,7 @@ class QuestionSerializer(serializers.ModelSerializer):
         fields = ('id', 'answer_type', 'text', 'answers_pool')
 
 
-class SurveySerializer(serializers.ModelSerializer):
+class SurveySerializer(TimedSerializerMixin, serializers.ModelSerializer):
     category = serializers.SlugRelatedField(
         slug_field='slug',
         queryset=Category.objects.all()
@@ -44,7 +87,7 @@ class SurveySerializer(serializers.ModelSerializer):
         )
 
 
-class SurveyRetrieveListSerializer(serializers.ModelSerializer):
+class SurveyRetrieveListSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     questions = QuestionSerializer(read_only=True, many=True)
 
@@ -57,7 +100,26 @@ class SurveyRetrieveListSerializer(serializers.ModelSerializer):
         )
 
 
-class AnswerSerializer(serializers.ModelSerializer):
+def validate_answer(answer_type, answers_pool_size, text, choices):
+    if answer_type == Question.OPEN_ANSWER:
+        if not text or choices:
+            raise serializers.ValidationError('Wrong open answer.')
+    elif answer_type == Question.SINGLE_CHOICE_ANSWER:
+        if text or not choices or len(choices) != 1:
+            raise serializers.ValidationError('Wrong single choice answer.')
+    elif answer_type == Question.MULTIPLE_CHOICE_ANSWER:
+        if (
+                text
+                or not choices
+                or min(choices) < 0
+                or max(choices) >= answers_pool_size
+        ):
+            raise serializers.ValidationError('Wrong multiple choice answer.')
+    else:
+        raise serializers.ValidationError('Wrong answer type.')
+
+
+class AnswerSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     user = serializers.SlugRelatedField(
         read_only=True, slug_field='username'
     )
@@ -69,31 +131,74 @@ class AnswerSerializer(serializers.ModelSerializer):
     )
 
     def validate(self, data):
-        answer_type = self.context['answer_type']
-        answers_pool_size = self.context['answers_pool_size']
+        validate_answer(
+            self.context['answer_type'],
+            self.context['answers_pool_size'],
+            data.get('text'),
+            data.get('choices')
+        )
+        return data
 
-        text = data.get('text')
-        choices = data.get('choices')
+    class Meta:
+        model = Answer
+        fields = ('id', 'user', 'survey', 'question', 'text', 'choices', 'anonym_id')
 
-        if answer_type == Question.OPEN_ANSWER:
-            if not text or choices:
-                raise serializers.ValidationError('Wrong open answer.')
-        elif answer_type == Question.SINGLE_CHOICE_ANSWER:
-            if text or not choices or len(choices) != 1:
-                raise serializers.ValidationError('Wrong single choice answer.')
-        elif answer_type == Question.MULTIPLE_CHOICE_ANSWER:
-            if (
-                    text
-                    or not choices
-                    or min(choices) < 0
-                    or max(choices) >= answers_pool_size
-            ):
-                raise serializers.ValidationError('Wrong multiple choice answer.')
-        else:
-            raise serializers.ValidationError('Wrong answer type.')
 
-        return data
+class AnswerSearchSerializer(AnswerSerializer):
+    # ответ, найденный полнотекстовым поиском (фильтр search)
+    rank = serializers.FloatField(read_only=True)
+    headline = serializers.CharField(read_only=True)
+
+    class Meta(AnswerSerializer.Meta):
+        fields = AnswerSerializer.Meta.fields + ('rank', 'headline')
+
+
+class BulkAnswerItemSerializer(serializers.ModelSerializer):
+    question = serializers.IntegerField()
 
     class Meta:
         model = Answer
-        fields = ('id', 'user', 'survey', 'question', 'text', 'choices', 'anonym_id')
+        fields = ('question', 'text', 'choices')
+
+
+class BulkAnswerSerializer(serializers.Serializer):
+    answers = BulkAnswerItemSerializer(many=True, allow_empty=False)
+
+    def validate_answers(self, answers):
+        # все вопросы опроса, на которые даны ответы, загружаются одним запросом
+        questions = self.context['survey'].questions.in_bulk(
+            {answer['question'] for answer in answers}
+        )
+
+        errors = []
+        for answer in answers:
+            question = questions.get(answer['question'])
+            try:
+                if question is None:
+                    raise serializers.ValidationError('Question not found in survey.')
+                validate_answer(
+                    question.answer_type,
+                    len(question.answers_pool) if question.answers_pool else 0,
+                    answer.get('text'),
+                    answer.get('choices')
+                )
+            except serializers.ValidationError as error:
+                errors.append(error.detail)
+            else:
+                errors.append({})
+                answer['question'] = question
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return answers
+
+
+class SurveyDeletionSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    survey = serializers.IntegerField(source='survey_id', read_only=True)
+
+    class Meta:
+        model = SurveyDeletion
+        fields = (
+            'id', 'survey', 'status', 'archive', 'archive_path', 'answers_total', 'answers_deleted',
+            'error', 'created_at', 'started_at', 'finished_at'
+        )
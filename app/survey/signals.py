@@ -0,0 +1,173 @@
+import datetime
+
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import Signal, receiver
+
+from .authentication import revoke_tokens
+from .cache import bump_answers_version, invalidate_surveys
+from .counters import answers_deltas, update_counters
+from .models import Answer, Category, Question, QuestionSurvey, Survey, User
+from .rollup import invalidate_results, is_closed
+
+# Отправляется после массовой записи ответов (bulk_create), при которой
+# post_save для отдельных ответов не вызывается.
+answers_bulk_created = Signal(providing_args=['answers'])
+
+# поля пользователя, при изменении которых выданные ему токены отзываются
+TOKEN_USER_FIELDS = ('username', 'is_staff', 'is_active', 'password')
+
+
+@receiver(pre_save, sender=Answer)
+def remember_answer_state(sender, instance, **kwargs):
+    instance._previous_state = None
+    if not instance._state.adding:
+        # строка блокируется до конца транзакции: параллельное изменение того же ответа
+        # прочитает уже новое состояние и не вычтет из счетчиков прежнее дважды
+        instance._previous_state = Answer.objects.select_for_update().filter(pk=instance.pk).first()
+
+
+@receiver(post_save, sender=Answer)
+def update_counters_on_save(sender, instance, **kwargs):
+    deltas = answers_deltas([instance])
+    previous = getattr(instance, '_previous_state', None)
+    if previous is not None:
+        deltas.subtract(answers_deltas([previous]))
+    update_counters(deltas)
+
+
+@receiver(post_delete, sender=Answer)
+def update_counters_on_delete(sender, instance, **kwargs):
+    update_counters(answers_deltas([instance], sign=-1))
+
+
+@receiver(answers_bulk_created)
+def update_counters_on_bulk_create(sender, answers, **kwargs):
+    update_counters(answers_deltas(answers))
+
+
+def bump_answers_version_on_commit(survey_ids):
+    # версия увеличивается после фиксации, иначе результат, вычисленный параллельным
+    # запросом без новых ответов, мог бы попасть в кеш с новой версией
+    survey_ids = set(survey_ids)
+    transaction.on_commit(lambda: bump_answers_version(survey_ids))
+
+
+@receiver(post_save, sender=Answer)
+@receiver(post_delete, sender=Answer)
+def bump_answers_version_on_answer(sender, instance, **kwargs):
+    bump_answers_version_on_commit([instance.survey_id])
+
+
+@receiver(answers_bulk_created)
+def bump_answers_version_on_bulk_create(sender, answers, **kwargs):
+    bump_answers_version_on_commit(answer.survey_id for answer in answers)
+
+
+def closed_survey_ids(answers):
+    # итоги есть только у закрытых опросов; если опрос ответа уже загружен,
+    # ответы в открытый опрос не требуют запроса к базе
+    return {
+        answer.survey_id for answer in answers
+        if not Answer.survey.is_cached(answer) or is_closed(answer.survey)
+    }
+
+
+@receiver(post_save, sender=Answer)
+@receiver(post_delete, sender=Answer)
+def invalidate_results_on_answer(sender, instance, **kwargs):
+    survey_ids = closed_survey_ids([instance])
+    if survey_ids:
+        invalidate_results(survey_ids)
+
+
+@receiver(answers_bulk_created)
+def invalidate_results_on_bulk_create(sender, answers, **kwargs):
+    survey_ids = closed_survey_ids(answers)
+    if survey_ids:
+        invalidate_results(survey_ids)
+
+
+@receiver(pre_save, sender=Survey)
+def remember_survey_reopening(sender, instance, update_fields=None, **kwargs):
+    # опрос продлевается после закрытия, если дата конца перенесена из прошлого в будущее;
+    # прежняя дата читается, только если новая дата открывает опрос
+    instance._reopened = False
+    if instance._state.adding or is_closed(instance):
+        return
+    if update_fields is not None and 'end_date' not in update_fields:
+        return
+    previous = Survey.objects.filter(pk=instance.pk).values_list('end_date', flat=True).first()
+    instance._reopened = previous is not None and previous < datetime.date.today()
+
+
+@receiver(post_save, sender=Survey)
+def invalidate_reopened_survey_results(sender, instance, created, **kwargs):
+    # итоги опроса, продленного после закрытия, больше не окончательные
+    if getattr(instance, '_reopened', False):
+        invalidate_results([instance.id])
+
+
+def invalidate_surveys_on_commit(survey_ids):
+    # версия опроса увеличивается после фиксации транзакции: до нее параллельный запрос
+    # еще читает прежние данные и может сохранить их в кеш под текущей версией
+    survey_ids = list(survey_ids)
+    transaction.on_commit(lambda: invalidate_surveys(survey_ids))
+
+
+@receiver(post_save, sender=Survey)
+@receiver(post_delete, sender=Survey)
+def invalidate_survey(sender, instance, **kwargs):
+    invalidate_surveys_on_commit([instance.id])
+
+
+@receiver(post_save, sender=Question)
+@receiver(pre_delete, sender=Question)
+def invalidate_question_surveys(sender, instance, **kwargs):
+    invalidate_surveys_on_commit(
+        QuestionSurvey.objects.filter(question=instance).values_list('survey_id', flat=True)
+    )
+
+
+@receiver(post_save, sender=QuestionSurvey)
+@receiver(post_delete, sender=QuestionSurvey)
+def invalidate_question_survey(sender, instance, **kwargs):
+    invalidate_surveys_on_commit([instance.survey_id])
+
+
+@receiver(m2m_changed, sender=Survey.questions.through)
+def invalidate_survey_questions(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        invalidate_surveys_on_commit([instance.id])
+    elif action == 'pre_clear':
+        invalidate_surveys_on_commit(instance.survey_set.values_list('id', flat=True))
+    else:
+        invalidate_surveys_on_commit(pk_set)
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def invalidate_category_surveys(sender, instance, **kwargs):
+    invalidate_surveys_on_commit(instance.surveys.values_list('id', flat=True))
+
+
+@receiver(pre_save, sender=User)
+def remember_token_user_state(sender, instance, **kwargs):
+    instance._token_state = None
+    if not instance._state.adding:
+        instance._token_state = User.objects.filter(pk=instance.pk).values(*TOKEN_USER_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def revoke_tokens_on_user_change(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_token_state', None)
+    if previous is not None and any(previous[field] != getattr(instance, field) for field in TOKEN_USER_FIELDS):
+        revoke_tokens(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def revoke_tokens_on_user_delete(sender, instance, **kwargs):
+    revoke_tokens(instance.pk)
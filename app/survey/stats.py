@@ -0,0 +1,128 @@
+from collections import Counter
+
+from django.db import connections
+
+from .counters import totals_stat
+from .models import AnswerCounter, QuestionSurvey
+
+# Гистограмма выборов и счетчики ответов считаются одним запросом:
+# строка с choice = NULL содержит общее число ответов и число свободных ответов,
+# остальные строки - число выборов каждого варианта ответа.
+ANSWERS_STAT_SQL = '''
+WITH answers AS ({answers})
+SELECT NULL, COUNT(*), COUNT(*) FILTER (WHERE answers.text <> '')
+FROM answers
+UNION ALL
+SELECT choice, COUNT(*), NULL
+FROM answers, unnest(answers.choices) AS choice
+GROUP BY choice
+ORDER BY 1 NULLS LAST
+'''
+
+
+def answers_stat(queryset):
+    sql, params = queryset.order_by().values('text', 'choices').query.sql_with_params()
+
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(ANSWERS_STAT_SQL.format(answers=sql), params)
+        rows = cursor.fetchall()
+
+    statistics = {}
+    for choice, count, text_count in rows:
+        if choice is None:
+            statistics['answersTotalCount'] = count
+            statistics['textAnswersCount'] = text_count
+        else:
+            statistics[choice] = count
+
+    return statistics
+
+
+# Статистика опроса одним запросом из трех частей:
+# - вопросы опроса (строки с count = NULL);
+# - число ответов (choice = ANSWERS_TOTAL), свободных ответов (choice = TEXT_ANSWERS) и выборов
+#   каждого варианта по вопросам - по таблице ответов или, без фильтров по респондентам, по счетчикам;
+# - число респондентов (user_id, anonym_id) и число респондентов, ответивших на все вопросы опроса
+#   (строка с question_id = NULL). Группировка по респондентам читает индекс answer_respondent_idx
+#   по порядку и не требует сортировки.
+# Выборка ответов не материализуется (NOT MATERIALIZED, PostgreSQL 12+), чтобы каждая часть
+# запроса могла использовать свой индекс.
+SURVEY_STATS_SQL = '''
+WITH answers AS NOT MATERIALIZED ({answers}),
+questions AS (SELECT question_id FROM {question_survey} WHERE survey_id = %s)
+SELECT question_id, NULL::integer, NULL::bigint, NULL::bigint
+FROM questions
+UNION ALL
+{totals}
+UNION ALL
+SELECT NULL, NULL, COUNT(*), COUNT(*) FILTER (WHERE answered = (SELECT COUNT(*) FROM questions))
+FROM (
+    SELECT COUNT(DISTINCT question_id) FILTER (
+        WHERE question_id = ANY(ARRAY(SELECT question_id FROM questions))
+    ) AS answered
+    FROM answers
+    GROUP BY user_id, anonym_id
+) AS respondents
+'''
+
+ANSWER_TOTALS_SQL = '''
+SELECT question_id, {answers_total}, COUNT(*), NULL
+FROM answers
+GROUP BY question_id
+UNION ALL
+SELECT question_id, {text_answers}, COUNT(*), NULL
+FROM answers
+WHERE text <> ''
+GROUP BY question_id
+UNION ALL
+SELECT question_id, choice, COUNT(*), NULL
+FROM answers, unnest(answers.choices) AS choice
+GROUP BY question_id, choice
+'''.format(
+    answers_total=AnswerCounter.ANSWERS_TOTAL,
+    text_answers=AnswerCounter.TEXT_ANSWERS,
+)
+
+COUNTER_TOTALS_SQL = '''
+SELECT question_id, choice, SUM(count), NULL
+FROM {counters}
+WHERE survey_id = %s AND (%s IS NULL OR anonym = %s)
+GROUP BY question_id, choice
+'''.format(counters=AnswerCounter._meta.db_table)
+
+
+def survey_stats(queryset, survey_id, counters=False, anonym=None):
+    # queryset - ответы опроса после фильтрации; при counters=True число ответов и выборов
+    # берется из счетчиков, и queryset может быть отфильтрован только по anonym
+    sql, params = queryset.order_by().values(
+        'question_id', 'user_id', 'anonym_id', 'text', 'choices'
+    ).query.sql_with_params()
+    params = [*params, survey_id]
+
+    if counters:
+        totals = COUNTER_TOTALS_SQL
+        params += [survey_id, anonym, anonym]
+    else:
+        totals = ANSWER_TOTALS_SQL
+
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(SURVEY_STATS_SQL.format(
+            answers=sql,
+            question_survey=QuestionSurvey._meta.db_table,
+            totals=totals
+        ), params)
+        rows = cursor.fetchall()
+
+    statistics = {'respondentsCount': 0, 'completedCount': 0, 'completionRate': 0, 'questions': {}}
+    totals = {question_id: Counter() for question_id, _, count, _ in rows if question_id is not None and count is None}
+    for question_id, choice, count, completed in rows:
+        if question_id is None:
+            statistics['respondentsCount'] = count
+            statistics['completedCount'] = completed
+            statistics['completionRate'] = round(completed / count, 4) if count else 0
+        elif count is not None and question_id in totals:
+            totals[question_id][choice] += count
+
+    for question_id, question_totals in totals.items():
+        statistics['questions'][question_id] = totals_stat(dict(sorted(question_totals.items())))
+    return statistics
@@ -0,0 +1,94 @@
+import threading
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from survey.anonym import ANONYM_TOKEN_COOKIE
+from survey.models import Answer
+
+from .utils import create_survey
+
+THREADS = 16
+REQUESTS_PER_THREAD = 5
+
+
+class AnonymIdConcurrencyTest(TransactionTestCase):
+    # ID анонимных респондентов выдаются последовательностью и не совпадают при параллельных запросах
+    def setUp(self):
+        cache.clear()
+        survey = create_survey('survey')
+        question = survey.questions.get(answer_type='O')
+        self.url = f'/api/v1/surveys/{survey.id}/questions/{question.id}/answers/'
+
+    def post_answers(self, barrier, results, errors):
+        try:
+            barrier.wait()
+            for _ in range(REQUESTS_PER_THREAD):
+                # новый клиент - новая сессия, то есть новый анонимный респондент
+                response = APIClient().post(self.url, {'text': 'answer'}, format='json')
+                if response.status_code != 201:
+                    errors.append(response.status_code)
+                else:
+                    results.append(response.data['anonym_id'])
+        except Exception as error:
+            errors.append(error)
+        finally:
+            connection.close()
+
+    def test_concurrent_anonymous_answers_get_unique_ids(self):
+        barrier = threading.Barrier(THREADS)
+        results, errors = [], []
+        threads = [
+            threading.Thread(target=self.post_answers, args=(barrier, results, errors))
+            for _ in range(THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(results), THREADS * REQUESTS_PER_THREAD)
+        self.assertEqual(len(set(results)), len(results))
+        self.assertEqual(
+            Answer.objects.values('anonym_id').distinct().count(), THREADS * REQUESTS_PER_THREAD
+        )
+
+    def test_same_session_keeps_id(self):
+        client = APIClient()
+        first = client.post(self.url, {'text': 'first'}, format='json')
+        second = client.post(self.url, {'text': 'second'}, format='json')
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(first.data['anonym_id'], second.data['anonym_id'])
+
+
+@override_settings(ANONYM_IDENTITY='signed')
+class SignedAnonymTokenTest(TestCase):
+    # ID выдается с первым ответом, а получение опроса не обращается к последовательности
+    @classmethod
+    def setUpTestData(cls):
+        cls.survey = create_survey('survey')
+        question = cls.survey.questions.get(answer_type='O')
+        cls.url = f'/api/v1/surveys/{cls.survey.id}/questions/{question.id}/answers/'
+
+    def setUp(self):
+        cache.clear()
+
+    def test_retrieve_does_not_issue_token(self):
+        client = APIClient()
+        survey_url = f'/api/v1/surveys/{self.survey.id}/'
+        self.assertEqual(client.get(survey_url).status_code, 200)
+        with self.assertNumQueries(0):
+            response = client.get(survey_url)
+        self.assertNotIn(ANONYM_TOKEN_COOKIE, response.cookies)
+
+    def test_first_answer_issues_token(self):
+        client = APIClient()
+        first = client.post(self.url, {'text': 'first'}, format='json')
+        self.assertEqual(first.status_code, 201)
+        self.assertIn(ANONYM_TOKEN_COOKIE, first.cookies)
+
+        second = client.post(self.url, {'text': 'second'}, format='json')
+        self.assertEqual(second.data['anonym_id'], first.data['anonym_id'])
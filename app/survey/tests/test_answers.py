@@ -0,0 +1,47 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from survey.models import Answer, User
+
+from .utils import create_survey
+
+
+class AnswerCreateTest(TestCase):
+    # Опрос и вопрос загружаются одним запросом на весь запрос к API (AnswerViewSet.initial).
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='admin', is_staff=True)
+        cls.survey = create_survey('survey')
+        cls.question = cls.survey.questions.get(answer_type='S')
+        cls.other_question = create_survey('other').questions.get(answer_type='S')
+
+    def setUp(self):
+        cache.clear()
+        self.url = f'/api/v1/surveys/{self.survey.id}/questions/{self.question.id}/answers/'
+
+    def test_admin_post_queries(self):
+        # пользователь, опрос с вопросом, запись ответа, счетчики ответов
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.admin).access_token}')
+        with self.assertNumQueries(4):
+            response = client.post(self.url, {'choices': [1]}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_anonymous_post_queries(self):
+        # опрос с вопросом, новый ID анонимного респондента, запись ответа, счетчики ответов
+        client = APIClient()
+        with self.assertNumQueries(4):
+            response = client.post(self.url, {'choices': [1]}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        # ID респондента уже в сессии
+        with self.assertNumQueries(3):
+            client.post(self.url, {'choices': [2]}, format='json')
+
+    def test_question_not_in_survey(self):
+        url = f'/api/v1/surveys/{self.survey.id}/questions/{self.other_question.id}/answers/'
+        response = APIClient().post(url, {'choices': [1]}, format='json')
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Answer.objects.exists())
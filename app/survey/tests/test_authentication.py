@@ -0,0 +1,34 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from survey.authentication import SurveyTokenObtainPairSerializer
+from survey.models import User
+
+
+class StatelessJWTTest(TestCase):
+    # JWT_STATELESS читается при каждом запросе: пользователь восстанавливается из токена без запроса к базе.
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='admin', is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        token = SurveyTokenObtainPairSerializer.get_token(self.admin).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def captured_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/v1/questions/')
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in context]
+
+    def test_override_settings(self):
+        user_table = User._meta.db_table
+        with override_settings(JWT_STATELESS=False):
+            self.assertTrue(any(user_table in sql for sql in self.captured_queries()))
+        with override_settings(JWT_STATELESS=True):
+            self.assertFalse(any(user_table in sql for sql in self.captured_queries()))
@@ -0,0 +1,62 @@
+from django.core.cache import cache
+from django.test import TransactionTestCase
+from rest_framework.test import APIClient
+
+from survey.cache import cache_survey, survey_version
+from survey.models import User
+
+from .utils import create_survey
+
+
+class SurveyCacheTest(TransactionTestCase):
+    # Кешированный опрос сбрасывается после фиксации изменения и читается только по каноническому ID.
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user('admin', password='admin', is_staff=True)
+        self.survey = create_survey('survey')
+        self.client = APIClient()
+        self.url = f'/api/v1/surveys/{self.survey.id}/'
+
+    def test_edit_invalidates_cached_survey(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['name'], 'survey')
+        etag = response['ETag']
+
+        # опрос читается из кеша
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        admin = APIClient()
+        admin.force_authenticate(self.admin)
+        response = admin.patch(self.url, {'name': 'renamed'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['name'], 'renamed')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_stale_write_after_edit_is_not_served(self):
+        # параллельный запрос прочитал версию и опрос до изменения, а записал в кеш после него
+        version = survey_version(self.survey.id)
+        stale = self.client.get(self.url).data
+
+        admin = APIClient()
+        admin.force_authenticate(self.admin)
+        self.assertEqual(admin.patch(self.url, {'name': 'renamed'}, format='json').status_code, 200)
+        cache_survey(self.survey.id, version, stale)
+
+        self.assertEqual(self.client.get(self.url).data['name'], 'renamed')
+
+    def test_scheduled_deletion_hides_cached_survey(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+        admin = APIClient()
+        admin.force_authenticate(self.admin)
+        self.assertEqual(admin.delete(self.url).status_code, 202)
+
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_leading_zero_id_not_found(self):
+        response = self.client.get(f'/api/v1/surveys/0{self.survey.id}/')
+        self.assertEqual(response.status_code, 404)
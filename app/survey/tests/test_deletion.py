@@ -0,0 +1,47 @@
+import gzip
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TransactionTestCase, override_settings
+
+from survey import deletion as survey_deletion
+from survey.models import Answer, Survey, SurveyDeletion
+
+from .utils import create_survey
+
+
+class SurveyDeletionTest(TransactionTestCase):
+    # Задание отмечает ход архивирования и считает ответы по счетчикам, а не по таблице ответов.
+    def setUp(self):
+        cache.clear()
+        self.survey = create_survey('survey')
+        question = self.survey.questions.get(answer_type='O')
+        for number in range(3):
+            Answer.objects.create(survey=self.survey, question=question, text=f'answer {number}', anonym_id=number + 1)
+        self.archive_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.archive_dir.cleanup)
+
+    def test_archive_heartbeat(self):
+        deletion = survey_deletion.schedule_deletion(self.survey, archive=True)
+        heartbeats = []
+        save = SurveyDeletion.save
+
+        def record_save(instance, *args, **kwargs):
+            if kwargs.get('update_fields') == ('updated_at',):
+                heartbeats.append(instance.id)
+            return save(instance, *args, **kwargs)
+
+        with override_settings(SURVEY_ARCHIVE_DIR=self.archive_dir.name), \
+                mock.patch.object(survey_deletion, 'ARCHIVE_HEARTBEAT_ROWS', 1), \
+                mock.patch.object(SurveyDeletion, 'save', record_save):
+            survey_deletion.process_deletion(survey_deletion.next_deletion(), batch_size=2)
+
+        deletion.refresh_from_db()
+        self.assertEqual(deletion.status, SurveyDeletion.DONE)
+        self.assertEqual(heartbeats, [deletion.id] * 3)
+        self.assertEqual(deletion.answers_total, 3)
+        self.assertEqual(deletion.answers_deleted, 3)
+        with gzip.open(deletion.archive_path, 'rt', encoding='utf-8') as archive:
+            self.assertEqual(len(archive.readlines()), 3)
+        self.assertFalse(Survey.objects.filter(id=self.survey.id).exists())
@@ -0,0 +1,39 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TransactionTestCase
+
+from survey.models import Answer
+
+from .utils import create_survey
+
+
+class ImportAnonymIdTest(TransactionTestCase):
+    # Новые anonym_id выдаются после сдвига последовательности за наибольший ID всего файла.
+    def setUp(self):
+        self.survey = create_survey('survey')
+        self.question = self.survey.questions.get(answer_type='O')
+
+    def import_rows(self, rows, *args):
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson', delete=False, encoding='utf-8') as file:
+            for row in rows:
+                file.write(json.dumps({'survey': self.survey.id, 'question': self.question.id, **row}) + '\n')
+        self.addCleanup(os.remove, file.name)
+        call_command('import_answers', file.name, *args, stdout=StringIO())
+
+    def test_missing_ids_do_not_collide_with_later_batches(self):
+        self.import_rows(
+            [{'text': 'new'}, {'text': 'new'}, {'text': 'legacy', 'anonym_id': 2}, {'text': 'legacy', 'anonym_id': 2}],
+            '--batch-size', '1'
+        )
+        anonym_ids = list(Answer.objects.filter(text='new').values_list('anonym_id', flat=True))
+        self.assertEqual(len(set(anonym_ids)), 2)
+        self.assertTrue(all(anonym_id > 2 for anonym_id in anonym_ids))
+        self.assertEqual(Answer.objects.filter(anonym_id=2).count(), 2)
+
+    def test_rejects_zero_anonym_id_without_user(self):
+        self.import_rows([{'text': 'anonymous', 'anonym_id': 0}])
+        self.assertFalse(Answer.objects.exists())
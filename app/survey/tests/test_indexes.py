@@ -0,0 +1,82 @@
+import io
+import json
+import os
+import re
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from survey.models import Answer, User
+
+# таблица ответов и, при секционировании, ее секции
+ANSWER_RELATION = re.compile(r'^survey_answer(_s\d+|_default)?$')
+
+
+def plan_nodes(plan):
+    yield plan
+    for child in plan.get('Plans', ()):
+        yield from plan_nodes(child)
+
+
+def answer_seq_scans(sql):
+    # узлы плана, читающие таблицу ответов последовательным сканированием
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return [
+        node for node in plan_nodes(plan[0]['Plan'])
+        if node['Node Type'] == 'Seq Scan' and ANSWER_RELATION.match(node.get('Relation Name', ''))
+    ]
+
+
+class AnswerIndexTest(TestCase):
+    # Запросы списка ответов и статистики по ответам на наборе данных seed_benchmark
+    # читают таблицу ответов по индексам, а не последовательным сканированием.
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'seed_benchmark', surveys=10, questions=10, answers=200, output=os.devnull, stderr=io.StringIO()
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        cls.admin = User.objects.get(username='bench-admin')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        answer = Answer.objects.order_by('id').first()
+        self.anonym_id = answer.anonym_id
+        self.url = f'/api/v1/surveys/{answer.survey_id}/questions/{answer.question_id}/answers/'
+
+    def assertIndexScans(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        answer_queries = [query['sql'] for query in context if 'survey_answer' in query['sql']]
+        self.assertTrue(answer_queries)
+        for sql in answer_queries:
+            self.assertEqual(answer_seq_scans(sql), [], sql)
+
+    def test_list(self):
+        self.assertIndexScans(self.url)
+
+    def test_list_anonym(self):
+        self.assertIndexScans(f'{self.url}?anonym=true')
+
+    def test_list_anonym_id(self):
+        self.assertIndexScans(f'{self.url}?anonym_id={self.anonym_id}')
+
+    def test_list_user(self):
+        self.assertIndexScans(f'{self.url}?user=bench-admin')
+
+    def test_stat_anonym_id(self):
+        self.assertIndexScans(f'{self.url}stat/?anonym_id={self.anonym_id}')
+
+    def test_stat_user(self):
+        self.assertIndexScans(f'{self.url}stat/?user=anonym')
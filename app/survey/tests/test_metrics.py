@@ -0,0 +1,34 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import PermissionDenied
+from django.test import RequestFactory, TestCase, override_settings
+
+from survey.models import User
+from survey.views import metrics
+
+
+class MetricsAccessTest(TestCase):
+    # Гистограммы запросов раскрывают время и число запросов представлений и доступны не всем.
+    def request(self, user=None, **extra):
+        request = RequestFactory().get('/metrics', **extra)
+        request.user = user or AnonymousUser()
+        return request
+
+    @override_settings(METRICS_ALLOWED_IPS=[], METRICS_TOKEN='')
+    def test_anonymous_denied(self):
+        with self.assertRaises(PermissionDenied):
+            metrics(self.request())
+
+    @override_settings(METRICS_ALLOWED_IPS=[], METRICS_TOKEN='')
+    def test_admin_allowed(self):
+        admin = User.objects.create_user('admin', password='admin', is_staff=True)
+        self.assertEqual(metrics(self.request(admin)).status_code, 200)
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.5'], METRICS_TOKEN='')
+    def test_allowed_ip(self):
+        self.assertEqual(metrics(self.request(REMOTE_ADDR='10.0.0.5')).status_code, 200)
+
+    @override_settings(METRICS_ALLOWED_IPS=[], METRICS_TOKEN='secret')
+    def test_token(self):
+        self.assertEqual(metrics(self.request(HTTP_AUTHORIZATION='Bearer secret')).status_code, 200)
+        with self.assertRaises(PermissionDenied):
+            metrics(self.request(HTTP_AUTHORIZATION='Bearer wrong'))
@@ -0,0 +1,80 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from survey.models import Answer, Survey, User
+from survey.pagination import SurveyPagination
+
+from .utils import create_survey
+
+
+class SurveyCursorPaginationTest(TestCase):
+    # Опросы с одной датой начала различаются только именем, и курсор должен пройти их все без OFFSET.
+    @classmethod
+    def setUpTestData(cls):
+        today = timezone.now().date()
+        Survey.objects.bulk_create(
+            Survey(name=f'survey-{number:04}', start_date=today, end_date=today)
+            for number in range(SurveyPagination.page_size * 2 + 50)
+        )
+        cls.survey_ids = set(Survey.objects.values_list('id', flat=True))
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def follow(self, url, link):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([survey['id'] for survey in response.data['results']])
+            url = response.data[link]
+        return pages, response
+
+    def test_next_returns_every_survey_once(self):
+        pages, response = self.follow('/api/v1/surveys/?pagination=cursor', 'next')
+        ids = [survey_id for page in pages for survey_id in page]
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(len(ids), len(self.survey_ids))
+        self.assertEqual(set(ids), self.survey_ids)
+        self.assertEqual(ids, list(Survey.objects.order_by('start_date', 'name').values_list('id', flat=True)))
+
+        # обратный проход с последней страницы возвращает те же страницы
+        previous_pages, _ = self.follow(response.data['previous'], 'previous')
+        self.assertEqual(previous_pages, pages[-2::-1])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/v1/surveys/?cursor=invalid')
+        self.assertEqual(response.status_code, 404)
+
+
+class AnswerSearchPaginationTest(TestCase):
+    # Результаты поиска упорядочены по релевантности, а курсор упорядочил бы их по id.
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='admin', is_staff=True)
+        survey = create_survey('survey')
+        question = survey.questions.get(answer_type='O')
+        cls.url = f'/api/v1/surveys/{survey.id}/questions/{question.id}/answers/'
+        for text in ('опрос о погоде', 'погода и погода'):
+            Answer.objects.create(user=cls.admin, survey=survey, question=question, text=text, anonym_id=0)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_search_rejects_cursor(self):
+        for params in ('pagination=cursor', 'cursor=invalid'):
+            response = self.client.get(f'{self.url}?search=погода&{params}')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('search', response.data)
+
+    def test_search_pages_by_rank(self):
+        response = self.client.get(f'{self.url}?search=погода')
+        self.assertEqual(response.status_code, 200)
+        ranks = [answer['rank'] for answer in response.data['results']]
+        self.assertEqual(len(ranks), 2)
+        self.assertEqual(ranks, sorted(ranks, reverse=True))
@@ -0,0 +1,104 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from survey.models import Answer, Survey, User
+from survey.queries import QueryProblem, detect_queries
+
+from .utils import create_survey
+
+
+class ListQueryCountTest(TestCase):
+    # Число запросов к базе при получении списка не должно расти вместе с числом объектов на странице.
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='admin', is_staff=True)
+        cls.survey = create_survey('survey-0')
+        cls.question = cls.survey.questions.order_by('id').first()
+        cls.answer(cls.admin)
+
+    @classmethod
+    def answer(cls, user):
+        Answer.objects.create(
+            user=user, survey=cls.survey, question=cls.question, choices=[0], anonym_id=0
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def count_queries(self, url):
+        # детектор прерывает тест при N+1 или медленном запросе с указанием поля сериализатора
+        with CaptureQueriesContext(connection) as context, detect_queries(view=url):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context)
+
+    def assertQueriesConstant(self, url, add_objects):
+        queries = self.count_queries(url)
+        add_objects()
+        self.assertEqual(self.count_queries(url), queries)
+
+    def test_survey_list(self):
+        self.assertQueriesConstant(
+            '/api/v1/surveys/',
+            lambda: [create_survey(f'survey-{number}') for number in range(1, 6)]
+        )
+
+    def test_question_list(self):
+        self.assertQueriesConstant(
+            '/api/v1/questions/',
+            lambda: [create_survey(f'survey-{number}') for number in range(1, 6)]
+        )
+
+    def test_survey_question_list(self):
+        self.assertQueriesConstant(
+            f'/api/v1/surveys/{self.survey.id}/questions/',
+            lambda: self.survey.questions.add(*create_survey('survey-1', questions=5).questions.all())
+        )
+
+    def test_category_list(self):
+        self.assertQueriesConstant(
+            '/api/v1/categories/',
+            lambda: [create_survey(f'survey-{number}') for number in range(1, 6)]
+        )
+
+    def test_answer_list(self):
+        # у каждого ответа свой пользователь (поле user сериализатора)
+        self.assertQueriesConstant(
+            f'/api/v1/surveys/{self.survey.id}/questions/{self.question.id}/answers/',
+            lambda: [self.answer(User.objects.create_user(f'user-{number}')) for number in range(5)]
+        )
+
+
+class QueryDetectorTest(TestCase):
+    def test_reports_repeated_queries(self):
+        for number in range(6):
+            create_survey(f'survey-{number}', questions=0)
+
+        with self.assertRaisesMessage(QueryProblem, 'N+1'):
+            with detect_queries():
+                [survey.category.name for survey in Survey.objects.all()]
+
+    def test_ignores_prefetched_queries(self):
+        for number in range(6):
+            create_survey(f'survey-{number}', questions=0)
+
+        with detect_queries():
+            [survey.category.name for survey in Survey.objects.select_related('category')]
+
+    def test_reports_first_repeat_with_threshold_one(self):
+        for number in range(2):
+            create_survey(f'survey-{number}', questions=0)
+
+        with self.assertRaisesMessage(QueryProblem, 'N+1'):
+            with detect_queries(repeat_threshold=1):
+                [survey.category.name for survey in Survey.objects.all()]
+
+    def test_rejects_zero_threshold(self):
+        with self.assertRaises(ValueError):
+            with detect_queries(repeat_threshold=0):
+                pass
@@ -0,0 +1,35 @@
+import datetime
+
+from django.test import TestCase
+
+from survey.models import Survey, SurveyResults
+
+from .utils import create_survey
+
+
+class ReopenedSurveyResultsTest(TestCase):
+    # Итоги удаляются, только если дата конца перенесена из прошлого в будущее.
+    def setUp(self):
+        self.today = datetime.date.today()
+        self.survey = create_survey('survey')
+        Survey.objects.filter(id=self.survey.id).update(end_date=self.today - datetime.timedelta(days=1))
+        self.survey.refresh_from_db()
+        SurveyResults.objects.create(survey=self.survey, results={})
+
+    def test_reopening_invalidates_results(self):
+        self.survey.end_date = self.today + datetime.timedelta(days=7)
+        self.survey.save()
+        self.assertFalse(SurveyResults.objects.filter(survey=self.survey).exists())
+
+    def test_closed_survey_save_keeps_results(self):
+        self.survey.description = 'описание'
+        with self.assertNumQueries(1):
+            self.survey.save()
+        self.assertTrue(SurveyResults.objects.filter(survey=self.survey).exists())
+
+    def test_open_survey_save_skips_delete(self):
+        survey = create_survey('open')
+        survey.description = 'описание'
+        # прежняя дата конца и UPDATE опроса, без DELETE итогов
+        with self.assertNumQueries(2):
+            survey.save()
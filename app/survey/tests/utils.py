@@ -0,0 +1,15 @@
+from survey.models import Category, Question, Survey
+
+
+def create_survey(name, questions=3, category=None):
+    # опрос с вопросами всех типов по очереди: с одним вариантом, с несколькими, свободный
+    survey = Survey.objects.create(name=name, category=category or Category.objects.create(name=name, slug=name))
+    answer_types = (Question.SINGLE_CHOICE_ANSWER, Question.MULTIPLE_CHOICE_ANSWER, Question.OPEN_ANSWER)
+    for number in range(questions):
+        answer_type = answer_types[number % len(answer_types)]
+        survey.questions.add(Question.objects.create(
+            text=f'{name} вопрос {number}',
+            answer_type=answer_type,
+            answers_pool=None if answer_type == Question.OPEN_ANSWER else ['a', 'b', 'c']
+        ))
+    return survey
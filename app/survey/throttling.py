@@ -0,0 +1,40 @@
+from rest_framework import throttling
+
+
+class FixedWindowRateThrottle(throttling.SimpleRateThrottle):
+    # Число запросов считается в окне фиксированной длины (duration) счетчиком в кеше.
+    # SimpleRateThrottle читает и перезаписывает историю запросов целиком, поэтому
+    # параллельные запросы разных воркеров теряют друг друга; cache.add и cache.incr
+    # атомарны в Redis, поэтому счетчик точен для всех процессов.
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        window = int(self.now // self.duration)
+        self.window_end = (window + 1) * self.duration
+        key = f'{self.key}:{window}'
+
+        self.cache.add(key, 0, self.duration)
+        try:
+            count = self.cache.incr(key)
+        except ValueError:
+            # счетчик истек или вытеснен между add и incr
+            self.cache.add(key, 1, self.duration)
+            count = 1
+        return count <= self.num_requests
+
+    def wait(self):
+        return max(self.window_end - self.now, 0)
+
+
+class UserRateThrottle(FixedWindowRateThrottle, throttling.UserRateThrottle):
+    pass
+
+
+class AnonRateThrottle(FixedWindowRateThrottle, throttling.AnonRateThrottle):
+    pass
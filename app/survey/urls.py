@@ -10,6 +10,11 @@ router_v1.register(
     views.SurveyViewSet,
     basename='survey'
 )
+router_v1.register(
+    'survey-deletions',
+    views.SurveyDeletionViewSet,
+    basename='survey-deletion'
+)
 router_v1.register(
     'categories',
     views.CategoryViewSet,
@@ -30,5 +35,10 @@ router_v1.register(
     views.AnswerViewSet,
     basename='answer',
 )
+router_v1.register(
+    r'surveys/(?P<survey_id>\d+)/answers',
+    views.SurveyAnswerViewSet,
+    basename='survey-answer',
+)
 
 urlpatterns = [path('v1/', include(router_v1.urls))]
@@ -1,23 +1,45 @@
-from collections import Counter
-
-from django.db.models import Max
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.crypto import constant_time_compare
 from django.utils.decorators import method_decorator
+from django.utils.http import parse_etags
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
-from rest_framework import mixins, viewsets
+from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 from rest_framework.viewsets import ModelViewSet
 
+from .anonym import get_anonym_id, set_anonym_token
+from .authentication import ApiAuthenticationMixin, request_user
+from .cache import (cache_survey, get_cached_survey, get_or_compute_analytics,
+                    survey_version)
+from .counters import counters_stat
+from .crosstab import chi_square, crosstab
+from .deletion import schedule_deletion
+from .export import EXPORT_FORMATS, export_rows
 from .filters import AnswerFilter, SurveyFilter
-from .models import Answer, Category, Question, Survey
+from .ingestion import enqueue, queue_enabled
+from .metrics import registry
+from .models import (Answer, Category, Question, QuestionSurvey, Survey,
+                     SurveyDeletion)
 from .permissions import AnswerPermission, IsAdminOrReadOnly
-from .serializers import (AnswerSerializer, CategorySerializer,
-                          QuestionSerializer, SurveyRetrieveListSerializer,
-                          SurveySerializer)
+from .renderers import CSVRenderer, NDJSONRenderer
+from .rollup import is_closed, results_stat, results_stats
+from .serializers import (AnswerSearchSerializer, AnswerSerializer,
+                          BulkAnswerSerializer, CategorySerializer,
+                          QuestionSerializer, SurveyDeletionSerializer,
+                          SurveyRetrieveListSerializer, SurveySerializer,
+                          eager_loading)
+from .signals import answers_bulk_created
+from .stats import answers_stat, survey_stats
 
 anonym_id_filter_param = openapi.Parameter(
     'anonym_id',
@@ -46,6 +68,17 @@ anonym_filter_param = openapi.Parameter(
     ),
     type=openapi.TYPE_BOOLEAN
 )
+search_filter_param = openapi.Parameter(
+    'search',
+    openapi.IN_QUERY,
+    description=(
+        'Полнотекстовый поиск по свободным ответам (с учетом словоформ русского языка): ответы, содержащие '
+        'все слова запроса. В списке ответов они упорядочены по релевантности (`rank`), а в поле `headline` '
+        'возвращаются фрагменты текста с выделенными найденными словами. Поиск доступен только с постраничной '
+        'пагинацией: с `pagination=cursor` или `cursor` запрос завершается ошибкой 400.'
+    ),
+    type=openapi.TYPE_STRING
+)
 active_filter_param = openapi.Parameter(
     'active',
     openapi.IN_QUERY,
@@ -55,9 +88,37 @@ active_filter_param = openapi.Parameter(
     ),
     type=openapi.TYPE_BOOLEAN
 )
+crosstab_rows_param = openapi.Parameter(
+    'rows',
+    openapi.IN_QUERY,
+    description='ID вопроса опроса (с вариантами ответа), варианты которого образуют строки таблицы.',
+    type=openapi.TYPE_INTEGER,
+    required=True
+)
+crosstab_columns_param = openapi.Parameter(
+    'columns',
+    openapi.IN_QUERY,
+    description='ID вопроса опроса (с вариантами ответа), варианты которого образуют столбцы таблицы.',
+    type=openapi.TYPE_INTEGER,
+    required=True
+)
+crosstab_chi2_param = openapi.Parameter(
+    'chi2',
+    openapi.IN_QUERY,
+    description='Вычислить критерий независимости хи-квадрат (если `1`/`true`).',
+    type=openapi.TYPE_BOOLEAN
+)
+archive_param = openapi.Parameter(
+    'archive',
+    openapi.IN_QUERY,
+    description='Перед удалением сохранить ответы опроса в сжатый архив (если `1`/`true`).',
+    type=openapi.TYPE_BOOLEAN
+)
 
 # 201 Created
 response_201_created = openapi.Response('Создание успешно.')
+# 202 Accepted
+response_202_queued = openapi.Response('Ответ принят в очередь на запись (режим очереди).')
 # 204 No Content
 response_204_no_content = openapi.Response('Удаление успешно.')
 # 400 Bad Request
@@ -66,6 +127,18 @@ response_400_bad_request = openapi.Response('Ошибка.')
 response_401_unauth = openapi.Response('JWT токен отсутствует/невалидный/истекший.')
 # 403 Forbidden
 response_403_forbidden = openapi.Response('Нет права доступа.')
+# 503 Service Unavailable
+response_503_queue_full = openapi.Response('Очередь ответов переполнена, повторите запрос позже.')
+
+
+class AnonymTokenMixin:
+    # токен выдается анонимному респонденту, которому в запросе присвоен ID (ANONYM_IDENTITY = 'signed')
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        issued_anonym_id = getattr(request, 'issued_anonym_id', None)
+        if issued_anonym_id is not None:
+            set_anonym_token(response, issued_anonym_id)
+        return response
 
 
 @method_decorator(
@@ -132,6 +205,7 @@ response_403_forbidden = openapi.Response('Нет права доступа.')
     )
 )
 class CategoryViewSet(
+    ApiAuthenticationMixin,
     mixins.CreateModelMixin,
     mixins.RetrieveModelMixin,
     mixins.ListModelMixin,
@@ -225,13 +299,13 @@ class CategoryViewSet(
         tags=('QUESTIONS',)
     )
 )
-class QuestionViewSet(ModelViewSet):
+class QuestionViewSet(ApiAuthenticationMixin, ModelViewSet):
     serializer_class = QuestionSerializer
     permission_classes = (IsAdminUser,)
 
     def get_queryset(self):
         if 'survey_id' in self.kwargs:
-            survey = get_object_or_404(Survey, id=self.kwargs['survey_id'])
+            survey = get_object_or_404(Survey, id=self.kwargs['survey_id'], deletion_scheduled=False)
             return survey.questions.all()
         return Question.objects.all()
 
@@ -239,7 +313,7 @@ class QuestionViewSet(ModelViewSet):
         question = serializer.save()
 
         if 'survey_id' in self.kwargs:
-            survey = get_object_or_404(Survey, id=self.kwargs['survey_id'])
+            survey = get_object_or_404(Survey, id=self.kwargs['survey_id'], deletion_scheduled=False)
             survey.questions.add(question)
             survey.save()
 
@@ -312,41 +386,238 @@ class QuestionViewSet(ModelViewSet):
     decorator=swagger_auto_schema(
         operation_description=(
             'Удалить опрос по ID.\n\n'
+            'Опрос удаляется в фоне командой `process_survey_deletions`: запрос сразу возвращает задание '
+            'на удаление, прогресс которого доступен по ссылке из заголовка `Location`. Повторный запрос '
+            'возвращает уже запланированное задание.\n\n'
             'Права доступа: **Админ**.'
         ),
         responses={
-            204: response_204_no_content,
+            202: SurveyDeletionSerializer,
             401: response_401_unauth,
             403: response_403_forbidden,
             404: 'Опрос не найден.'
         },
-        tags=('SURVEYS',)
+        tags=('SURVEYS',),
+        manual_parameters=[archive_param]
     )
 )
-class SurveyViewSet(ModelViewSet):
-    queryset = Survey.objects.all()
+class SurveyViewSet(ApiAuthenticationMixin, ModelViewSet):
+    queryset = Survey.objects.filter(deletion_scheduled=False)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = SurveyFilter
     permission_classes = (IsAdminOrReadOnly,)
+    # имя опроса уникально, поэтому пара (дата начала, имя) однозначно задает позицию курсора
+    cursor_ordering = ('start_date', 'name')
+    # ID без ведущих нулей: кеш опроса читается и сбрасывается по одному ключу
+    lookup_value_regex = r'[1-9]\d*'
+
+    def get_queryset(self):
+        if self.action == 'destroy':
+            # повторное удаление возвращает задание или перезапускает завершившееся ошибкой
+            return Survey.objects.only('id', 'end_date')
+        if self.action in ['stats', 'crosstab']:
+            return super().get_queryset().only('id', 'end_date')
+        return eager_loading(super().get_queryset(), self.get_serializer_class())
+
+    def retrieve(self, request, *args, **kwargs):
+        # ID анонимного респондента выдается с первым ответом (AnonymTokenMixin представлений ответов),
+        # поэтому получение опроса из кеша не обращается к базе данных
+
+        # с параметрами запроса (фильтрами) опрос читается из базы в обход кеша
+        if request.query_params:
+            return super().retrieve(request, *args, **kwargs)
+
+        survey_id = int(kwargs['pk'])
+        version = survey_version(survey_id)
+        entry = get_cached_survey(survey_id, version)
+        if entry is None:
+            entry = cache_survey(survey_id, version, super().retrieve(request, *args, **kwargs).data)
+
+        if entry['etag'] in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(entry['data'])
+        response['ETag'] = entry['etag']
+        return response
+
+    def destroy(self, request, *args, **kwargs):
+        # каскадное удаление ORM загружает все ответы опроса в память, поэтому опрос удаляется в фоне
+        survey = self.get_object()
+        archive = request.query_params.get('archive', '').lower() in ('1', 'true')
+        deletion = schedule_deletion(survey, archive=archive)
+        if deletion is None:
+            raise Http404('No Survey matches the given query.')
+
+        response = Response(SurveyDeletionSerializer(deletion).data, status=status.HTTP_202_ACCEPTED)
+        response['Location'] = reverse('survey-deletion-detail', args=[deletion.id], request=request)
+        return response
 
     def get_serializer_class(self):
         if self.action in ['retrieve', 'list']:
             return SurveyRetrieveListSerializer
         return SurveySerializer
 
+    @swagger_auto_schema(
+        method='get',
+        operation_description=(
+            'Получить статистику опроса: статистику ответов по каждому вопросу (как `stat`), '
+            'число респондентов и долю респондентов, ответивших на все вопросы опроса.\n\n'
+            'Права доступа: **Админ**.'
+        ),
+        responses={
+            200: 'Статистика опроса.',
+            401: response_401_unauth,
+            403: response_403_forbidden,
+            404: 'Опрос не найден.'
+        },
+        tags=('SURVEYS',),
+        manual_parameters=[
+            anonym_filter_param,
+            user_filter_param,
+            anonym_id_filter_param,
+            search_filter_param
+        ]
+    )
+    @action(detail=True, methods=['get'], permission_classes=(IsAdminUser,))
+    def stats(self, request, *args, **kwargs):
+        survey = self.get_object()
+        filterset = AnswerFilter(request.query_params, queryset=Answer.objects.filter(survey=survey), request=request)
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+
+        filters = filterset.form.cleaned_data
+        if filters.get('user') or filters.get('anonym_id') is not None or filters.get('search'):
+            return Response(survey_stats(filterset.qs, survey.id))
+
+        # без фильтрации по конкретным пользователям и поиска число ответов берется из счетчиков,
+        # а статистика закрытого опроса - из его итогов
+        anonym = filters.get('anonym')
+        stats = results_stats(survey.id, anonym) if is_closed(survey) else None
+        if stats is None:
+            stats = survey_stats(filterset.qs, survey.id, counters=True, anonym=anonym)
+        return Response(stats)
+
+    @swagger_auto_schema(
+        method='get',
+        operation_description=(
+            'Получить таблицу сопряженности двух вопросов опроса с вариантами ответа: '
+            '`table[i][j]` - число респондентов, выбравших вариант `i` в вопросе `rows` '
+            'и вариант `j` в вопросе `columns`. С параметром `chi2` добавляется критерий '
+            'независимости хи-квадрат (`null`, если таблица вырождена).\n\n'
+            'Результат кешируется до появления новых ответов на опрос.\n\n'
+            'Права доступа: **Админ**.'
+        ),
+        responses={
+            200: 'Таблица сопряженности.',
+            400: response_400_bad_request,
+            401: response_401_unauth,
+            403: response_403_forbidden,
+            404: 'Опрос не найден.'
+        },
+        tags=('SURVEYS',),
+        manual_parameters=[
+            crosstab_rows_param,
+            crosstab_columns_param,
+            crosstab_chi2_param,
+            anonym_filter_param,
+            user_filter_param,
+            anonym_id_filter_param
+        ]
+    )
+    @action(detail=True, methods=['get'], permission_classes=(IsAdminUser,))
+    def crosstab(self, request, *args, **kwargs):
+        survey = self.get_object()
+        filterset = AnswerFilter(request.query_params, queryset=Answer.objects.filter(survey=survey), request=request)
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+
+        try:
+            question_ids = [int(request.query_params[param]) for param in ('rows', 'columns')]
+        except (KeyError, ValueError):
+            raise ValidationError('Parameters rows and columns should be question IDs.')
+        questions = survey.questions.exclude(answer_type=Question.OPEN_ANSWER).in_bulk(question_ids)
+        if len(questions) != len(set(question_ids)):
+            raise ValidationError('Crosstab requires choice questions of the survey.')
+        row_question, column_question = (questions[question_id] for question_id in question_ids)
+        with_chi2 = request.query_params.get('chi2', '').lower() in ('1', 'true')
+
+        def compute():
+            table = crosstab(filterset.qs, row_question, column_question)
+            data = {
+                'rows': {'question': row_question.id, 'choices': row_question.answers_pool},
+                'columns': {'question': column_question.id, 'choices': column_question.answers_pool},
+                'table': table.tolist(),
+                'total': int(table.sum()),
+            }
+            if with_chi2:
+                data['chiSquare'] = chi_square(table)
+            return data
+
+        # в ключ входят варианты ответов: их изменение не меняет версию ответов опроса
+        params = {
+            'filters': {key: str(value) for key, value in filterset.form.cleaned_data.items()},
+            'questions': [row_question.answers_pool, column_question.answers_pool],
+            'rows': row_question.id,
+            'columns': column_question.id,
+            'chi2': with_chi2,
+        }
+        return Response(get_or_compute_analytics('crosstab', survey.id, params, compute))
+
+
+@method_decorator(
+    name='retrieve',
+    decorator=swagger_auto_schema(
+        operation_description=(
+            'Получить состояние и прогресс задания на удаление опроса по ID.\n\n'
+            'Права доступа: **Админ**.'
+        ),
+        responses={
+            200: 'Задание на удаление опроса.',
+            401: response_401_unauth,
+            403: response_403_forbidden,
+            404: 'Задание не найдено.'
+        },
+        tags=('SURVEYS',)
+    )
+)
+@method_decorator(
+    name='list',
+    decorator=swagger_auto_schema(
+        operation_description=(
+            'Получить список заданий на удаление опросов (сначала новые).\n\n'
+            'Права доступа: **Админ**.'
+        ),
+        responses={
+            200: 'Список заданий с пагинацией.',
+            401: response_401_unauth,
+            403: response_403_forbidden
+        },
+        tags=('SURVEYS',)
+    )
+)
+class SurveyDeletionViewSet(ApiAuthenticationMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = SurveyDeletion.objects.order_by('-id')
+    serializer_class = SurveyDeletionSerializer
+    permission_classes = (IsAdminUser,)
+
 
 @method_decorator(
     name='create',
     decorator=swagger_auto_schema(
         operation_description=(
             'Создать ответ на вопрос опроса.\n\n'
+            'В режиме `ANONYM_IDENTITY=signed` анонимный пользователь без токена получает с первым ответом '
+            'подписанный токен со своим ID в cookie `anonym` и заголовке `X-Anonym-Token`; клиенты без cookie '
+            'передают его в заголовке `X-Anonym-Token` при создании следующих ответов.\n\n'
             'Права доступа: **Доступно анонимным пользователям**.'
         ),
         responses={
             201: 'Ответ успешно создан.',
+            202: response_202_queued,
             400: response_400_bad_request,
             401: response_401_unauth,
-            404: 'Опрос не найден.'
+            404: 'Опрос не найден.',
+            503: response_503_queue_full
         },
         tags=('ANSWERS',)
     )
@@ -384,54 +655,91 @@ class SurveyViewSet(ModelViewSet):
         manual_parameters=(
             anonym_filter_param,
             user_filter_param,
-            anonym_id_filter_param
+            anonym_id_filter_param,
+            search_filter_param
         )
     )
 )
-class AnswerViewSet(ModelViewSet):
+class AnswerViewSet(ApiAuthenticationMixin, AnonymTokenMixin, ModelViewSet):
     serializer_class = AnswerSerializer
     filter_backends = (DjangoFilterBackend,)
     filterset_class = AnswerFilter
     permission_classes = (AnswerPermission,)
+    cursor_ordering = 'id'
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+
+        # опрос и вопрос загружаются одним запросом один раз на запрос,
+        # заодно проверяется, что вопрос входит в опрос
+        question_survey = QuestionSurvey.objects.select_related('survey', 'question').filter(
+            survey_id=self.kwargs['survey_id'],
+            question_id=self.kwargs['question_id'],
+            survey__deletion_scheduled=False
+        ).first()
+        if question_survey is None:
+            raise Http404('No Question matches the given query.')
+
+        self.survey = question_survey.survey
+        self.question = question_survey.question
 
     def get_queryset(self):
-        survey = get_object_or_404(Survey, id=self.kwargs.get('survey_id'))
-        question = get_object_or_404(Question, id=self.kwargs.get('question_id'))
-        return Answer.objects.filter(survey=survey, question=question)
+        if getattr(self, 'swagger_fake_view', False):
+            return Answer.objects.none()
+        # вектор полнотекстового поиска нужен только в условиях запроса; постраничная
+        # пагинация требует устойчивого порядка, поиск упорядочивает ответы по релевантности
+        return eager_loading(
+            Answer.objects.filter(survey=self.survey, question=self.question).defer('search_vector').order_by('id'),
+            self.get_serializer_class()
+        )
 
-    def get_serializer_context(self):
-        question = get_object_or_404(Question, id=self.kwargs['question_id'])
+    def get_serializer_class(self):
+        if self.action == 'list' and self.request.query_params.get('search'):
+            return AnswerSearchSerializer
+        return super().get_serializer_class()
 
+    def get_serializer_context(self):
         context = super().get_serializer_context()
+        if getattr(self, 'swagger_fake_view', False):
+            return context
+
         context.update({
-            'answer_type': question.answer_type,
-            'answers_pool_size': len(question.answers_pool) if question.answers_pool else 0
+            'answer_type': self.question.answer_type,
+            'answers_pool_size': len(self.question.answers_pool) if self.question.answers_pool else 0
         })
 
         return context
 
+    def paginate_queryset(self, queryset):
+        # курсор упорядочивает ответы по id и потерял бы порядок результатов поиска по релевантности
+        if self.request.query_params.get('search') and self.paginator.is_cursor_requested(self.request):
+            raise ValidationError({'search': 'Поиск не поддерживает курсорную пагинацию.'})
+        return super().paginate_queryset(queryset)
+
+    def create(self, request, *args, **kwargs):
+        if not queue_enabled():
+            return super().create(request, *args, **kwargs)
+
+        # в режиме очереди ответ подтверждается сразу, а записывается обработчиком очереди
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        answer = Answer(**{
+            **serializer.validated_data,
+            'user': request_user(request),
+            'survey': self.survey,
+            'question': self.question,
+            'anonym_id': get_anonym_id(request),
+        })
+        enqueue([answer])
+        return Response(self.get_serializer(answer).data, status=status.HTTP_202_ACCEPTED)
+
     def perform_create(self, serializer):
-        survey = get_object_or_404(Survey, id=self.kwargs['survey_id'])
-        question = get_object_or_404(Question, id=self.kwargs['question_id'])
-
-        is_auth = self.request.user.is_authenticated
-
-        anonym_id = 0
-        if not is_auth:
-            if 'ANONYM_ID' in self.request.session:
-                anonym_id = self.request.session['ANONYM_ID']
-            else:
-                if not Answer.objects.exists():
-                    # значение 0 - для аутентифицированных пользователей
-                    anonym_id = 1
-                else:
-                    anonym_id = Answer.objects.aggregate(Max('anonym_id'))['anonym_id__max']
-                self.request.session['ANONYM_ID'] = anonym_id
+        anonym_id = get_anonym_id(self.request)
 
         serializer.save(
-            user=self.request.user if is_auth else None,
-            survey=survey,
-            question=question,
+            user=request_user(self.request),
+            survey=self.survey,
+            question=self.question,
             anonym_id=anonym_id
         )
 
@@ -445,23 +753,138 @@ class AnswerViewSet(ModelViewSet):
         manual_parameters=[
             anonym_filter_param,
             user_filter_param,
-            anonym_id_filter_param
+            anonym_id_filter_param,
+            search_filter_param
         ]
     )
     @action(detail=False, methods=['get'])
     def stat(self, request, *args, **kwargs):
-        qs = self.filter_queryset(self.get_queryset())
+        qs = self.get_queryset()
+
+        # без фильтрации по конкретным пользователям и поиска статистика берется из счетчиков ответов
+        filterset = self.filterset_class(request.query_params, queryset=qs, request=request)
+        if filterset.is_valid():
+            filters = filterset.form.cleaned_data
+            if not filters.get('user') and filters.get('anonym_id') is None and not filters.get('search'):
+                anonym = filters.get('anonym')
+                # итоги закрытого опроса вычисляются заранее командой rollup_survey_results
+                stat = results_stat(self.survey.id, self.question.id, anonym) if is_closed(self.survey) else None
+                if stat is None:
+                    stat = counters_stat(self.survey.id, self.question.id, anonym=anonym)
+                return Response(stat)
+
+        qs = self.filter_queryset(qs)
+        return Response(answers_stat(qs))
+
+
+class SurveyAnswerViewSet(ApiAuthenticationMixin, AnonymTokenMixin, viewsets.GenericViewSet):
+    serializer_class = BulkAnswerSerializer
+    filter_backends = (DjangoFilterBackend,)
+    filterset_class = AnswerFilter
+    permission_classes = (AnswerPermission,)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.survey = get_object_or_404(Survey, id=self.kwargs['survey_id'], deletion_scheduled=False)
 
-        answers_total_count = qs.count()
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return Answer.objects.none()
+        return Answer.objects.filter(survey=self.survey)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if not getattr(self, 'swagger_fake_view', False):
+            context['survey'] = self.survey
+        return context
+
+    @swagger_auto_schema(
+        method='post',
+        operation_description=(
+            'Создать ответы сразу на несколько вопросов опроса.\n\n'
+            'Права доступа: **Доступно анонимным пользователям**.'
+        ),
+        request_body=BulkAnswerSerializer,
+        responses={
+            201: AnswerSerializer(many=True),
+            202: response_202_queued,
+            400: response_400_bad_request,
+            401: response_401_unauth,
+            404: 'Опрос не найден.',
+            503: response_503_queue_full
+        },
+        tags=['ANSWERS']
+    )
+    @action(detail=False, methods=['post'])
+    def bulk(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        user = request_user(request)
+        anonym_id = get_anonym_id(request)
+        answers = [
+            Answer(user=user, survey=self.survey, anonym_id=anonym_id, **answer)
+            for answer in serializer.validated_data['answers']
+        ]
+
+        if queue_enabled():
+            enqueue(answers)
+            return Response(AnswerSerializer(answers, many=True).data, status=status.HTTP_202_ACCEPTED)
+
+        with transaction.atomic():
+            answers = Answer.objects.bulk_create(answers)
+            answers_bulk_created.send(sender=Answer, answers=answers)
+
+        return Response(AnswerSerializer(answers, many=True).data, status=status.HTTP_201_CREATED)
+
+    @swagger_auto_schema(
+        method='get',
+        operation_description=(
+            'Выгрузить все ответы опроса потоком в формате CSV (`?format=csv`) '
+            'или NDJSON (`?format=ndjson`).\n\n'
+            'Права доступа: **Админ**.'
+        ),
+        responses={
+            200: 'Ответы опроса.',
+            401: response_401_unauth,
+            403: response_403_forbidden,
+            404: 'Опрос не найден.'
+        },
+        tags=['ANSWERS'],
+        manual_parameters=[
+            anonym_filter_param,
+            user_filter_param,
+            anonym_id_filter_param,
+            search_filter_param
+        ]
+    )
+    @action(detail=False, methods=['get'], renderer_classes=(CSVRenderer, NDJSONRenderer))
+    def export(self, request, *args, **kwargs):
+        export_format = request.accepted_renderer.format
+        rows = export_rows(self.filter_queryset(self.get_queryset()))
+
+        response = StreamingHttpResponse(
+            EXPORT_FORMATS[export_format](rows),
+            content_type=request.accepted_renderer.media_type
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="survey-{self.kwargs["survey_id"]}-answers.{export_format}"'
+        )
+        return response
 
-        choices_counter = Counter()
-        for v in qs.values_list('choices'):
-            choices_counter.update(v[0])
 
-        text_answers_count = qs.filter(text__isnull=False).count()
+def metrics_allowed(request):
+    if request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS:
+        return True
+    if settings.METRICS_TOKEN and constant_time_compare(
+        request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {settings.METRICS_TOKEN}'
+    ):
+        return True
+    return request.user.is_staff
 
-        statistics = dict(choices_counter)
-        statistics['answersTotalCount'] = answers_total_count
-        statistics['textAnswersCount'] = text_answers_count
 
-        return Response(statistics)
+def metrics(request):
+    # гистограммы RequestMetricsMiddleware в текстовом формате Prometheus
+    if not metrics_allowed(request):
+        raise PermissionDenied
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -39,6 +39,38 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Метрики запросов: заголовок Server-Timing, журнал survey.metrics и эндпоинт /metrics
+REQUEST_METRICS = strtobool(os.getenv('REQUEST_METRICS', '0'))
+if REQUEST_METRICS:
+    MIDDLEWARE.insert(0, 'survey.middleware.RequestMetricsMiddleware')
+# /metrics доступен администраторам, адресам из METRICS_ALLOWED_IPS (через пробел)
+# и запросам с заголовком `Authorization: Bearer <METRICS_TOKEN>`
+METRICS_ALLOWED_IPS = os.getenv('METRICS_ALLOWED_IPS', '').split()
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Поиск N+1 и медленных запросов: 'off', 'log' (журнал survey.queries) или 'raise' (для тестов)
+QUERY_DETECTOR = os.getenv('QUERY_DETECTOR', 'off')
+QUERY_DETECTOR_REPEAT_THRESHOLD = int(os.getenv('QUERY_DETECTOR_REPEAT_THRESHOLD', 5))
+QUERY_DETECTOR_SLOW_MS = float(os.getenv('QUERY_DETECTOR_SLOW_MS', 100))
+if QUERY_DETECTOR != 'off':
+    MIDDLEWARE.insert(0, 'survey.queries.QueryDetectorMiddleware')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'survey': {
+            'handlers': ['console'],
+            'level': os.getenv('SURVEY_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
+
 ROOT_URLCONF = 'uss.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
@@ -71,8 +103,66 @@ DATABASES = {
     }
 }
 DATABASE_URL = os.getenv('DATABASE_URL')
-db_from_env = dj_database_url.config(default=DATABASE_URL, conn_max_age=500)
+db_from_env = dj_database_url.config(
+    default=DATABASE_URL,
+    conn_max_age=int(os.getenv('CONN_MAX_AGE', 500))
+)
 DATABASES['default'].update(db_from_env)
+# PgBouncer в режиме transaction pooling не сохраняет серверные курсоры между транзакциями
+if strtobool(os.getenv('DB_PGBOUNCER', '0')):
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+# 'list' - таблица ответов секционируется по опросам (survey.partitioning): миграция 0024
+# преобразует ее, а секции новых опросов создаются вместе с опросом; требует PostgreSQL 13+
+ANSWER_PARTITIONING = os.getenv('ANSWER_PARTITIONING', '')
+
+# Общий для всех процессов кеш (Redis) задается REDIS_URL; без него используется кеш
+# в памяти процесса (для разработки и тестов) или CACHE_BACKEND/CACHE_LOCATION.
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': REDIS_URL,
+            'OPTIONS': {
+                'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            },
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+            'LOCATION': os.getenv('CACHE_LOCATION', ''),
+        }
+    }
+# Сессия нужна анонимным респондентам только для ANONYM_ID. Сессия в подписанной cookie
+# не читается и не записывается в базу данных; SESSION_ENGINE позволяет выбрать
+# django.contrib.sessions.backends.cached_db или cache (при REDIS_URL).
+SESSION_ENGINE = os.getenv('SESSION_ENGINE', 'django.contrib.sessions.backends.signed_cookies')
+# ID анонимного респондента хранится в сессии ('session') или в подписанном токене ('signed'),
+# который выдается при получении опроса и проверяется без обращения к сессии
+ANONYM_IDENTITY = os.getenv('ANONYM_IDENTITY', 'session')
+# срок действия cookie с токеном анонимного респондента (в секундах)
+ANONYM_TOKEN_MAX_AGE = int(os.getenv('ANONYM_TOKEN_MAX_AGE', 365 * 24 * 60 * 60))
+# время хранения в кеше опросов, отдаваемых SurveyViewSet.retrieve (в секундах)
+SURVEY_CACHE_TIMEOUT = int(os.getenv('SURVEY_CACHE_TIMEOUT', 60 * 60))
+# время хранения в кеше аналитики по ответам (crosstab); новые ответы сбрасывают ее раньше
+ANALYTICS_CACHE_TIMEOUT = int(os.getenv('ANALYTICS_CACHE_TIMEOUT', 24 * 60 * 60))
+
+# Режим записи ответов: 'direct' - сразу в таблицу ответов, 'queue' - через очередь,
+# которую переносит в таблицу ответов команда drain_answer_queue
+ANSWER_INGESTION_MODE = os.getenv('ANSWER_INGESTION_MODE', 'direct')
+ANSWER_QUEUE_BATCH_SIZE = int(os.getenv('ANSWER_QUEUE_BATCH_SIZE', 5000))
+ANSWER_QUEUE_FLUSH_INTERVAL = float(os.getenv('ANSWER_QUEUE_FLUSH_INTERVAL', 1))
+ANSWER_QUEUE_MAX_PENDING = int(os.getenv('ANSWER_QUEUE_MAX_PENDING', 1000000))
+
+# Удаление опросов выполняет команда process_survey_deletions: ответы удаляются порциями
+# по SURVEY_DELETION_BATCH_SIZE, архивы ответов сохраняются в SURVEY_ARCHIVE_DIR
+SURVEY_DELETION_BATCH_SIZE = int(os.getenv('SURVEY_DELETION_BATCH_SIZE', 10000))
+SURVEY_DELETION_INTERVAL = float(os.getenv('SURVEY_DELETION_INTERVAL', 5))
+# задание, прогресс которого не обновлялся дольше (в секундах), снова берется в работу
+SURVEY_DELETION_STALE_TIMEOUT = int(os.getenv('SURVEY_DELETION_STALE_TIMEOUT', 10 * 60))
+SURVEY_ARCHIVE_DIR = os.getenv('SURVEY_ARCHIVE_DIR', os.path.join(BASE_DIR, 'archive'))
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -124,22 +214,22 @@ REST_FRAMEWORK = {
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ],
 
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'survey.pagination.SurveyPagination',
     'PAGE_SIZE': 100,
 
 
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.UserRateThrottle',
-        'rest_framework.throttling.AnonRateThrottle',
+        'survey.throttling.UserRateThrottle',
+        'survey.throttling.AnonRateThrottle',
     ],
     'DEFAULT_THROTTLE_RATES': {
-        'user': '10000/day',
-        'anon': '1000/day',
+        'user': os.getenv('THROTTLE_RATE_USER', '10000/day'),
+        'anon': os.getenv('THROTTLE_RATE_ANON', '1000/day'),
     }
 }
 if not DEBUG:
     REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = (
-        'rest_framework.renderers.JSONRenderer'
+        'rest_framework.renderers.JSONRenderer',
     )
 
 SIMPLE_JWT = {
@@ -147,6 +237,13 @@ SIMPLE_JWT = {
    'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# JWT_STATELESS=1 - API опросов аутентифицирует пользователя по утверждениям токена
+# (id, username, is_staff) без запроса к базе данных на каждый запрос
+JWT_STATELESS = strtobool(os.getenv('JWT_STATELESS', '0'))
+# как часто (в секундах) процесс перечитывает из кеша отметку об отзыве токенов пользователя
+JWT_REVOCATION_CHECK_TTL = int(os.getenv('JWT_REVOCATION_CHECK_TTL', 30))
+JWT_REVOCATION_CACHE_SIZE = int(os.getenv('JWT_REVOCATION_CACHE_SIZE', 10000))
+
 SWAGGER_SETTINGS = {
     'SECURITY_DEFINITIONS': {
         'Bearer': {
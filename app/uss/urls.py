@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.conf.urls import url
 from django.contrib import admin
 from django.urls import include, path
@@ -5,6 +6,9 @@ from drf_yasg import openapi
 from drf_yasg.views import get_schema_view
 from rest_framework import permissions
 
+from survey.authentication import SurveyTokenObtainPairView
+from survey.views import metrics
+
 schema_view = get_schema_view(
    openapi.Info(
       title='API системы опроса пользователей',
@@ -22,6 +26,8 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('survey.urls')),
     path('auth/', include('djoser.urls')),
+    # токен с утверждениями для StatelessJWTAuthentication (вместо jwt/create/ из djoser)
+    url(r'^auth/jwt/create/?$', SurveyTokenObtainPairView.as_view(), name='jwt-create'),
     path('auth/', include('djoser.urls.jwt')),
 ]
 
@@ -42,3 +48,6 @@ urlpatterns += [
        name='schema-redoc'
     ),
 ]
+
+if settings.REQUEST_METRICS:
+    urlpatterns.append(path('metrics', metrics, name='metrics'))
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# Нагрузочный тест API опросов: пропускная способность и задержки (p50/p95/p99) основных эндпоинтов.
+#
+#   docker-compose exec survey python manage.py seed_benchmark --output seed.json
+#   docker-compose exec survey python manage.py profile_queries seed.json --output queries.json
+#   python bench/loadtest.py --base-url http://localhost:8009 --seed seed.json --queries queries.json \
+#       --output baseline.json
+#   python bench/loadtest.py --base-url http://localhost:8009 --seed seed.json --compare baseline.json
+#
+# Скрипт использует только стандартную библиотеку и может запускаться вне контейнера.
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+# сценарии общие с командой profile_queries
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+from survey.benchmark import scenarios  # noqa: E402
+
+METRICS = ('rps', 'p50', 'p95', 'p99', 'queries')
+
+
+def obtain_token(base_url, credentials):
+    request = urllib.request.Request(
+        f'{base_url}/auth/jwt/create/',
+        json.dumps(credentials).encode(),
+        {'Content-Type': 'application/json'},
+        method='POST'
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)['access']
+
+
+def percentile(values, percent):
+    if not values:
+        return 0.0
+    return values[min(int(len(values) * percent / 100), len(values) - 1)]
+
+
+def worker(method, build, token, deadline, results, lock):
+    headers = {'Content-Type': 'application/json'}
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+
+    latencies = []
+    errors = 0
+    while time.monotonic() < deadline:
+        url, body = build()
+        data = json.dumps(body).encode() if body is not None else None
+        started = time.monotonic()
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, data, headers, method=method)) as response:
+                response.read()
+        except (urllib.error.URLError, ConnectionError):
+            errors += 1
+        latencies.append(time.monotonic() - started)
+
+    with lock:
+        results['latencies'].extend(latencies)
+        results['errors'] += errors
+
+
+def run(method, build, token, args):
+    results = {'latencies': [], 'errors': 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + args.duration
+    threads = [
+        threading.Thread(target=worker, args=(method, build, token, deadline, results, lock))
+        for _ in range(args.concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies = sorted(latency * 1000 for latency in results['latencies'])
+    return {
+        'requests': len(latencies),
+        'errors': results['errors'],
+        'rps': round(len(latencies) / args.duration, 1),
+        'p50': round(percentile(latencies, 50), 1),
+        'p95': round(percentile(latencies, 95), 1),
+        'p99': round(percentile(latencies, 99), 1),
+    }
+
+
+def report(name, result):
+    queries = f'{result["queries"]:6.1f} queries' if 'queries' in result else ''
+    print(
+        f'{name:16} {result["rps"]:9.1f} req/s   p50 {result["p50"]:7.1f} ms   p95 {result["p95"]:7.1f} ms   '
+        f'p99 {result["p99"]:7.1f} ms {result["errors"]:6} errors {queries}'
+    )
+
+
+def compare(results, baseline):
+    print('\nСравнение с базовым прогоном:')
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        changes = []
+        for metric in METRICS:
+            before, after = baseline[name].get(metric), result.get(metric)
+            if before is None or after is None:
+                continue
+            change = (after - before) / before * 100 if before else 0.0
+            changes.append(f'{metric} {before:g} -> {after:g} ({change:+.1f}%)')
+        print(f'{name:16} ' + ', '.join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--base-url', default='http://localhost:8009')
+    parser.add_argument('--seed', required=True, help='JSON, записанный командой seed_benchmark.')
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--page-size', type=int, default=100, help='Размер страницы списка ответов.')
+    parser.add_argument('--scenario', action='append', help='Запускаемые сценарии (по умолчанию все).')
+    parser.add_argument('--queries', help='JSON с числом запросов к базе (команда profile_queries).')
+    parser.add_argument('--output', help='Файл для записи результатов (базовый прогон для --compare).')
+    parser.add_argument('--compare', help='Результаты предыдущего прогона для сравнения.')
+    args = parser.parse_args()
+
+    with open(args.seed, encoding='utf-8') as seed_file:
+        seed = json.load(seed_file)
+    queries = {}
+    if args.queries:
+        with open(args.queries, encoding='utf-8') as queries_file:
+            queries = json.load(queries_file)
+    token = obtain_token(args.base_url, seed['admin'])
+
+    results = {}
+    for name, (as_admin, method, build) in scenarios(f'{args.base_url}/api/v1', seed, args.page_size).items():
+        if args.scenario and name not in args.scenario:
+            continue
+        results[name] = run(method, build, token if as_admin else None, args)
+        results[name].update(queries.get(name, {}))
+        report(name, results[name])
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            json.dump(results, output, indent=2)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as baseline:
+            compare(results, json.load(baseline))
+
+
+if __name__ == '__main__':
+    main()